@@ -7,11 +7,18 @@
 # 4. 필터링 키워드 체크 로직 구현
 # 5. 필터링된 대화만 JSONL 파일로 저장
 # 6. 통계 출력 (총 대화, 필터링된 대화, 저장된 대화)
+# 7. 중복/유사 대화 제거 (정확 중복: 정규화 해시, 유사 중복: MinHash + LSH)
 
 import pandas as pd
+import numpy as np
 import json
+import re
+import hashlib
+import unicodedata
 from datetime import datetime, timedelta
 
+from token_counter import count_message_tokens
+
 
 def filter_and_clean_message(content, filter_keywords):
     """
@@ -65,21 +72,333 @@ def filter_and_clean_message(content, filter_keywords):
     return cleaned_content, is_empty
 
 
+# MinHash용 32비트 해시 공간 (2^32보다 작은 가장 큰 소수)
+_MINHASH_PRIME = np.uint64(4294967291)
+
+
+def normalize_for_dedup(content):
+    """
+    중복 판단용 메시지 정규화
+
+    로직:
+    1. 유니코드 NFKC 정규화 + 소문자 변환
+    2. 문자/숫자만 남기고 공백, 문장부호, 이모지 제거
+       (짧은 메시지는 "웅" / "웅!"처럼 부호 하나만 달라도 n-gram 유사도가 크게 떨어지므로)
+    3. 같은 글자가 3번 이상 반복되면 2번으로 축약 (ㅋㅋㅋㅋㅋ → ㅋㅋ)
+    4. 남는 글자가 없으면 (이모지/부호만 있는 메시지) 부호를 지우지 않고 2~3만 적용
+
+    예시:
+    - "ㅋㅋㅋㅋ" / "ㅋㅋㅋㅋㅋㅋ!!" → "ㅋㅋ" (정확 중복으로 처리)
+    - "웅!" / "웅 😊" → "웅"
+    - "잘자\\n잘자" → "잘자잘자"
+    """
+    text = unicodedata.normalize('NFKC', content).lower()
+    stripped = ''.join(ch for ch in text if unicodedata.category(ch)[0] in ('L', 'N'))
+    if not stripped:
+        stripped = ''.join(text.split())
+    return re.sub(r'(.)\1{2,}', r'\1\1', stripped)
+
+
+def _conversation_dedup_key(conv):
+    """대화(user-assistant 쌍) 전체를 정규화한 중복 판단용 문자열"""
+    # 메시지 경계를 구분하기 위해 제어 문자로 연결 (user "A", assistant "B C"와 "A B", "C"를 구분)
+    # role 이름은 모든 대화에 공통이라 짧은 대화의 유사도를 부풀리므로 넣지 않음
+    return '\x1f'.join(normalize_for_dedup(msg['content']) for msg in conv['messages'])
+
+
+def _minhash_signature(text, shingle_size, coef_a, coef_b):
+    """문자 n-gram 집합의 MinHash 시그니처 계산 (numpy 벡터 연산)"""
+    if len(text) <= shingle_size:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + shingle_size] for i in range(len(text) - shingle_size + 1)}
+
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little')
+         for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # (a * h + b) mod p 를 permutation 개수만큼 한 번에 계산 후 최솟값
+    return ((coef_a[:, None] * hashes[None, :] + coef_b[:, None]) % _MINHASH_PRIME).min(axis=1)
+
+
+def deduplicate_conversations(
+    conversations,
+    near_dup_threshold=0.8,
+    max_copies_per_cluster=1,
+    num_perm=64,
+    num_bands=16,
+    shingle_size=2,
+    max_bucket_compare=8,
+    seed=42
+):
+    """
+    정확 중복 + 유사 중복 대화 제거
+
+    로직:
+    1. 정규화한 대화 내용을 해시해서 정확 중복끼리 묶음
+    2. 고유한 대화마다 MinHash 시그니처 계산
+    3. 시그니처를 num_bands개 밴드로 나눠 버킷팅 (LSH) → 같은 버킷의 대화만 비교
+       (버킷의 앞쪽 max_bucket_compare개 대화와 비교)
+    4. 추정 Jaccard 유사도가 near_dup_threshold 이상이면 같은 클러스터로 합침
+    5. 클러스터마다 원래 순서대로 max_copies_per_cluster개까지만 유지
+
+    대화를 모두 쌍으로 비교하지 않고 버킷 안에서만 비교하므로 대화 수에 거의 선형으로 동작
+
+    Parameters:
+    - conversations: [{"messages": [...]}, ...]
+    - near_dup_threshold: 유사 중복으로 볼 추정 Jaccard 유사도 (0~1)
+    - max_copies_per_cluster: 클러스터(중복 묶음)당 남길 최대 대화 수
+    - num_perm: MinHash permutation 개수 (num_bands로 나누어 떨어져야 함)
+    - num_bands: LSH 밴드 개수 (많을수록 후보를 넓게 잡음)
+    - shingle_size: 문자 n-gram 크기 (한글은 2 권장)
+    - max_bucket_compare: 버킷 하나에서 비교할 최대 대화 수
+      (버킷이 아주 커지면 앞쪽 대화들과만 비교 - 그 뒤끼리만 비슷한 대화는 다른 밴드에서
+       만나지 않으면 놓칠 수 있지만 비교 횟수는 대화 수에 선형으로 유지)
+    - seed: MinHash 계수 생성용 시드
+
+    Returns:
+    - (deduped_conversations, report)
+      - deduped_conversations: 중복 제거된 대화 리스트 (원래 순서 유지)
+      - report: 통계 딕셔너리 (제거 개수, 토큰 절감량, 유지된 인덱스 등)
+    """
+    if num_perm % num_bands != 0:
+        raise ValueError(f"num_perm({num_perm})은 num_bands({num_bands})로 나누어 떨어져야 합니다")
+    if max_copies_per_cluster < 1:
+        raise ValueError("max_copies_per_cluster는 1 이상이어야 합니다")
+
+    rows_per_band = num_perm // num_bands
+
+    # union-find (클러스터 대표 인덱스 관리)
+    parent = list(range(len(conversations)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            # 먼저 나온 대화를 대표로 유지
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    # 1. 정확 중복: 정규화 내용의 해시
+    keys = [_conversation_dedup_key(conv) for conv in conversations]
+    exact_hashes = [hashlib.sha1(key.encode('utf-8')).hexdigest() for key in keys]
+    first_by_hash = {}
+    unique_indices = []
+    for i, h in enumerate(exact_hashes):
+        if h in first_by_hash:
+            union(first_by_hash[h], i)
+        else:
+            first_by_hash[h] = i
+            unique_indices.append(i)
+
+    # 2~4. 유사 중복: MinHash + LSH 밴딩 (고유한 대화만 계산)
+    rng = np.random.default_rng(seed)
+    coef_a = rng.integers(1, _MINHASH_PRIME, size=num_perm, dtype=np.uint64)
+    coef_b = rng.integers(0, _MINHASH_PRIME, size=num_perm, dtype=np.uint64)
+
+    signatures = {}
+    buckets = {}
+    for i in unique_indices:
+        signature = _minhash_signature(keys[i], shingle_size, coef_a, coef_b)
+        signatures[i] = signature
+        for band in range(num_bands):
+            band_key = (band, signature[band * rows_per_band:(band + 1) * rows_per_band].tobytes())
+            bucket = buckets.setdefault(band_key, [])
+            for j in bucket:
+                if find(j) == find(i):
+                    continue
+                similarity = float(np.mean(signatures[j] == signature))
+                if similarity >= near_dup_threshold:
+                    union(j, i)
+            if len(bucket) < max_bucket_compare:
+                bucket.append(i)
+
+    # 5. 클러스터별로 max_copies_per_cluster개까지만 유지
+    cluster_sizes = {}
+    kept_per_cluster = {}
+    kept_hashes = set()
+    kept_indices = []
+    removed_indices = []
+    for i in range(len(conversations)):
+        root = find(i)
+        cluster_sizes[root] = cluster_sizes.get(root, 0) + 1
+        if kept_per_cluster.get(root, 0) < max_copies_per_cluster:
+            kept_per_cluster[root] = kept_per_cluster.get(root, 0) + 1
+            kept_indices.append(i)
+            kept_hashes.add(exact_hashes[i])
+        else:
+            removed_indices.append(i)
+
+    removed_exact = sum(1 for i in removed_indices if exact_hashes[i] in kept_hashes)
+
+    tokens_before = sum(count_message_tokens(conv['messages']) for conv in conversations)
+    tokens_saved = sum(count_message_tokens(conversations[i]['messages']) for i in removed_indices)
+
+    report = {
+        "total": len(conversations),
+        "kept": len(kept_indices),
+        "removed_exact": removed_exact,
+        "removed_near": len(removed_indices) - removed_exact,
+        "duplicate_clusters": sum(1 for size in cluster_sizes.values() if size > 1),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_before - tokens_saved,
+        "tokens_saved": tokens_saved,
+        "kept_indices": kept_indices,
+    }
+
+    return [conversations[i] for i in kept_indices], report
+
+
+def print_dedup_report(report):
+    """deduplicate_conversations 결과 통계 출력"""
+    saved_ratio = report['tokens_saved'] / report['tokens_before'] * 100 if report['tokens_before'] else 0
+    print(f"\n🧹 중복 제거 통계:")
+    print(f"  입력 대화: {report['total']}개")
+    print(f"  └─ 정확 중복 제거: {report['removed_exact']}개")
+    print(f"  └─ 유사 중복 제거: {report['removed_near']}개")
+    print(f"  └─ 중복 클러스터: {report['duplicate_clusters']}개")
+    print(f"  └─ 남은 대화: {report['kept']}개")
+    print(f"  토큰: {report['tokens_before']} → {report['tokens_after']} "
+          f"({report['tokens_saved']}개 절감, {saved_ratio:.1f}%)")
+
+
+def deduplicate_jsonl_file(input_file, output_file, **dedup_kwargs):
+    """
+    이미 만들어진 JSONL 파일에 중복 제거만 따로 적용
+
+    Parameters:
+    - input_file: 입력 JSONL 파일 경로
+    - output_file: 출력 JSONL 파일 경로
+    - dedup_kwargs: deduplicate_conversations에 그대로 전달할 옵션
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        conversations = [json.loads(line) for line in f if line.strip()]
+
+    deduped, report = deduplicate_conversations(conversations, **dedup_kwargs)
+    print_dedup_report(report)
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for conv in deduped:
+            f.write(json.dumps(conv, ensure_ascii=False) + '\n')
+
+    print(f"\n💾 파일 저장: {output_file}")
+    return deduped, report
+
+
+def pack_conversations(conversations, turn_positions, max_example_tokens=2048):
+    """
+    같은 세션의 연속된 1턴 대화들을 토큰 예산 안에서 멀티턴 예제 하나로 합치기
+
+    로직:
+    1. 대화를 원래 순서대로 순회
+    2. 직전 대화와 같은 세션이고 바로 다음 턴이면 현재 예제에 이어 붙임
+    3. 이어 붙였을 때 max_example_tokens를 넘거나 세션/턴이 끊기면 새 예제 시작
+    4. 1턴만으로 예산을 넘는 대화는 자르지 않고 단독 예제로 유지
+
+    Parameters:
+    - conversations: [{"messages": [user, assistant]}, ...]
+    - turn_positions: 각 대화의 (session_id, turn_index) 리스트 (conversations와 같은 길이)
+    - max_example_tokens: 예제 하나의 최대 토큰 수 (token_counter의 o200k_base 토큰 수 기준)
+
+    Returns:
+    - packed: [{"messages": [user, assistant, user, assistant, ...]}, ...]
+    """
+    packed = []
+    current_messages = []
+    current_tokens = 0
+    last_position = None
+
+    for conv, position in zip(conversations, turn_positions):
+        conv_tokens = count_message_tokens(conv['messages'])
+
+        is_next_turn = (
+            last_position is not None
+            and position[0] == last_position[0]
+            and position[1] == last_position[1] + 1
+        )
+        fits = current_tokens + conv_tokens <= max_example_tokens
+
+        if current_messages and not (is_next_turn and fits):
+            packed.append({"messages": current_messages})
+            current_messages = []
+            current_tokens = 0
+
+        current_messages = current_messages + conv['messages']
+        current_tokens += conv_tokens
+        last_position = position
+
+    if current_messages:
+        packed.append({"messages": current_messages})
+
+    return packed
+
+
+def summarize_examples(conversations, max_example_tokens=2048):
+    """
+    학습 예제 통계 (예제 수, 총 토큰, 패딩 낭비)
+
+    패딩 낭비는 모든 예제를 max_example_tokens 길이로 맞춘다고 가정했을 때
+    채워지지 않는 토큰 수 (예산을 넘는 예제는 낭비 0으로 계산)
+
+    Returns:
+    - {"examples", "total_tokens", "padding_tokens", "fill_ratio"}
+    """
+    example_tokens = [count_message_tokens(conv['messages']) for conv in conversations]
+    total_tokens = sum(example_tokens)
+    padding_tokens = sum(max(max_example_tokens - tokens, 0) for tokens in example_tokens)
+    capacity = total_tokens + padding_tokens
+
+    return {
+        "examples": len(conversations),
+        "total_tokens": total_tokens,
+        "padding_tokens": padding_tokens,
+        "fill_ratio": total_tokens / capacity if capacity else 0,
+    }
+
+
+def print_packing_report(before, after, max_example_tokens):
+    """pack_conversations 전후 통계 비교 출력"""
+    print(f"\n📦 멀티턴 패킹 통계 (예산 {max_example_tokens} 토큰/예제):")
+    print(f"  예제 수: {before['examples']}개 → {after['examples']}개")
+    print(f"  총 토큰: {before['total_tokens']} → {after['total_tokens']}")
+    print(f"  패딩 낭비: {before['padding_tokens']} → {after['padding_tokens']} 토큰")
+    print(f"  채움 비율: {before['fill_ratio'] * 100:.1f}% → {after['fill_ratio'] * 100:.1f}%")
+
+
 def create_simple_finetuning_data(
     csv_file, 
     session_gap_minutes=30, 
     output_file='basic_finetuning_data.jsonl', 
-    filter_keywords=None
+    filter_keywords=None,
+    dedup=True,
+    near_dup_threshold=0.8,
+    max_copies_per_cluster=1,
+    output_mode='pairs',
+    max_example_tokens=2048
 ):
     """
     카카오톡 CSV를 1턴(user-assistant 쌍)씩 JSONL로 변환
+    (output_mode='packed'면 같은 세션의 연속된 턴을 멀티턴 예제로 합쳐서 저장)
     
     Parameters:
     - csv_file: 입력 CSV 파일 경로
     - session_gap_minutes: 새 세션으로 분리할 시간 간격 (분)
     - output_file: 출력 JSONL 파일 경로
     - filter_keywords: 필터링할 키워드 리스트 (해당 키워드 포함 시 제외)
+    - dedup: True면 저장 전에 정확/유사 중복 대화 제거
+    - near_dup_threshold: 유사 중복으로 볼 추정 Jaccard 유사도 (0~1)
+    - max_copies_per_cluster: 중복 묶음당 남길 최대 대화 수
+    - output_mode: 'pairs' (1턴씩) 또는 'packed' (세션 내 연속 턴을 토큰 예산까지 합침)
+    - max_example_tokens: 'packed' 모드에서 예제 하나의 최대 토큰 수
     """
+    if output_mode not in ('pairs', 'packed'):
+        raise ValueError(f"output_mode는 'pairs' 또는 'packed'여야 합니다: {output_mode}")
     
     # TODO 1: CSV 파일 읽기
     print("📂 CSV 파일 읽는 중...")
@@ -87,6 +406,8 @@ def create_simple_finetuning_data(
     print(f"  총 {len(df)}개 메시지 로드됨")
     
     conversations = []  # 최종 1턴씩 저장할 리스트
+    turn_positions = []  # 각 대화의 (세션 번호, 턴 번호) - 멀티턴 패킹용
+    session_index = 0
     
     # 현재 처리 중인 메시지 관련 변수
     last_sender = None
@@ -128,6 +449,7 @@ def create_simple_finetuning_data(
                 accumulated_messages = []
             
             # 세션이 끝났으므로 현재 턴 초기화
+            session_index += 1
             current_user_message = None
             current_assistant_message = None
             last_sender = None
@@ -171,6 +493,7 @@ def create_simple_finetuning_data(
                                 {"role": "assistant", "content": cleaned_assistant}
                             ]
                         })
+                        turn_positions.append((session_index, total_turns))
                         saved_turns += 1
                     
                     # 저장 후 초기화
@@ -212,8 +535,28 @@ def create_simple_finetuning_data(
                         {"role": "assistant", "content": cleaned_assistant}
                     ]
                 })
+                turn_positions.append((session_index, total_turns))
                 saved_turns += 1
     
+    # TODO 7: 중복/유사 대화 제거
+    dedup_report = None
+    if dedup:
+        print("\n🧹 중복 대화 제거 중...")
+        conversations, dedup_report = deduplicate_conversations(
+            conversations,
+            near_dup_threshold=near_dup_threshold,
+            max_copies_per_cluster=max_copies_per_cluster
+        )
+        turn_positions = [turn_positions[i] for i in dedup_report['kept_indices']]
+    
+    # 멀티턴 패킹
+    packing_stats = None
+    if output_mode == 'packed':
+        print("\n📦 멀티턴 예제로 패킹 중...")
+        before_stats = summarize_examples(conversations, max_example_tokens)
+        conversations = pack_conversations(conversations, turn_positions, max_example_tokens)
+        packing_stats = (before_stats, summarize_examples(conversations, max_example_tokens))
+    
     # TODO 5: JSONL 파일로 저장
     print("\n💾 JSONL 파일 저장 중...")
     with open(output_file, 'w', encoding='utf-8') as f:
@@ -226,13 +569,20 @@ def create_simple_finetuning_data(
     print(f"  총 1턴 대화: {total_turns}개")
     print(f"  └─ 부분 필터링: {partially_filtered_turns}개 (일부 라인만 제거)")
     print(f"  └─ 완전 제거: {completely_removed_turns}개 (모든 내용이 필터링 키워드)")
-    print(f"  └─ 저장된 대화: {saved_turns}개")
+    print(f"  └─ 필터링 통과: {saved_turns}개")
+    print(f"  파일에 저장된 예제: {len(conversations)}개 (중복 제거/패킹 적용 후)")
     
     if filter_keywords:
         print(f"\n🔍 필터링 키워드 ({len(filter_keywords)}개):")
         for keyword in filter_keywords:
             print(f"  - '{keyword}'")
     
+    if dedup_report:
+        print_dedup_report(dedup_report)
+    
+    if packing_stats:
+        print_packing_report(*packing_stats, max_example_tokens)
+    
     print(f"\n💾 파일 저장: {output_file}")
     
     return conversations
@@ -257,7 +607,12 @@ if __name__ == "__main__":
         csv_file='chat_adjusted.csv',
         session_gap_minutes=30,
         output_file='basic_finetuning_data.jsonl',
-        filter_keywords=filter_keywords
+        filter_keywords=filter_keywords,
+        dedup=True,
+        near_dup_threshold=0.8,
+        max_copies_per_cluster=2,
+        output_mode='pairs',  # 'packed'로 바꾸면 세션 단위 멀티턴 예제로 저장
+        max_example_tokens=2048
     )
     
     # 샘플 출력
@@ -271,6 +626,6 @@ if __name__ == "__main__":
         
         # 검증
         first_role = conv['messages'][0]['role']
-        last_role = conv['messages'][1]['role']
+        last_role = conv['messages'][-1]['role']
         status = "✅" if first_role == "user" and last_role == "assistant" else "❌"
         print(f"  {status} 형식: {first_role} → {last_role}")
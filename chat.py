@@ -1,29 +1,67 @@
 import os
+import time
 import asyncio
 import logging
-from datetime import datetime
+import functools
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
 import firebase_admin
 from firebase_admin import credentials, firestore
 
+from retrieval import FallbackResponder
+from long_term_memory import LongTermMemory
+from rate_limit import RateLimitGovernor
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from token_counter import count_message_tokens
+
 from dotenv import load_dotenv
 load_dotenv()
 
 # 로거 설정
 logger = logging.getLogger("namuna-chat")
 
+# fallback 응답기도 답을 못 찾을 때 쓰는 최종 기본 메시지
+DEFAULT_ERROR_MESSAGE = "나무나 오류 발생.. 나무 너 큰일났다 이제.. 이쁘니 사랑해"
+
+
+class FallbackReply(str):
+    """
+    AI 응답 대신 돌려준 fallback 답장 (일반 문자열처럼 사용 가능)
+    
+    나무가 실제로 한 말이 아니므로 장기 기억/대화 기록에는 나무 답장으로 넣지 않음
+    """
+
 
 class NamunaChat:
 
     def __init__(self, api_key: str = None, firebase_cred_path: str = None):
         # OpenAI 설정
         self.api_key = api_key or os.getenv("NAMUNA_API_KEY")
-        self.client = OpenAI(api_key=self.api_key)
+        self.response_deadline = 25.0  # AI 응답 생성 전체 제한 시간 (초, 재시도 포함)
+        # 429 재시도는 RateLimitGovernor가 직접 관리하므로 SDK 자체 재시도는 끔
+        # HTTP 요청 자체도 제한 시간에서 끊어서 스레드가 기본값(600초)까지 붙잡히지 않도록 함
+        self.client = OpenAI(api_key=self.api_key, max_retries=0, timeout=self.response_deadline)
         # self.model = "ft:gpt-4o-2024-08-06:o-ren-ge:namuna-004:CP6vk9Av"
         self.model = "ft:gpt-4.1-2025-04-14:o-ren-ge:namuna-002:CP65FD0f:ckpt-step-656"
         self.temperature = 0.63
         self.max_retries = 3
+        self.completion_token_estimate = 200  # 한도 계산용 예상 응답 토큰 수
+        self.rate_limiter = RateLimitGovernor()
+        
+        # 의존성별 서킷 브레이커 (장애 시 타임아웃/재시도를 기다리지 않고 바로 fallback)
+        self.firestore_timeout = 5.0  # Firestore 호출 1회 최대 대기 시간 (초)
+        self.firestore_breaker = CircuitBreaker(
+            "firestore", slow_call_seconds=2.0, open_seconds=30.0, half_open_timeout=self.firestore_timeout
+        )
+        self.openai_breaker = CircuitBreaker(
+            "openai", slow_call_seconds=15.0, open_seconds=30.0, half_open_timeout=self.response_deadline
+        )
+        
+        # Firestore를 쓸 수 없을 때 대신 쓰는 오늘 대화 기록 (로컬 메모리)
+        self._local_history = {"date": None, "messages": []}
+        self.memory_top_k = 3  # 프롬프트에 넣을 지난 날짜 기억 개수
+        self.memory_backfill_days = 30  # 시작 시 로컬 기억에 없으면 Firestore에서 채울 기간 (일)
         
         # 현재 날짜와 시간 정보 생성 (한국 시간)
         kst = ZoneInfo("Asia/Seoul")
@@ -58,6 +96,12 @@ Example:
         # Firebase 초기화
         self._init_firebase(firebase_cred_path)
         
+        # 로컬 fallback 응답기 (학습 데이터 검색 인덱스) 로드
+        self._init_fallback_responder()
+        
+        # 날짜를 넘어서는 장기 기억 인덱스 로드
+        self._init_long_term_memory()
+        
     def _init_firebase(self, cred_path: str = None):
         """Firebase 초기화"""
         try:
@@ -86,26 +130,112 @@ Example:
             logger.error(f"   /etc/secrets/ 존재 여부: {os.path.exists('/etc/secrets/')}")
             self.db = None
     
+    def _init_fallback_responder(self):
+        """학습 데이터 기반 fallback 응답기 로드 (인덱스 파일이 없으면 JSONL에서 생성)"""
+        try:
+            self.fallback_responder = FallbackResponder.load_or_build()
+            logger.info(f"✅ fallback 응답기 로드 완료 ({len(self.fallback_responder)}개 발화)")
+        except Exception as e:
+            logger.error(f"❌ fallback 응답기 로드 실패: {e}")
+            self.fallback_responder = None
+    
+    def _init_long_term_memory(self):
+        """장기 기억 인덱스 로드 (Firestore 백필은 서버 시작 후 backfill_long_term_memory에서 진행)"""
+        try:
+            self.long_term_memory = LongTermMemory(top_k=self.memory_top_k)
+            logger.info(f"✅ 장기 기억 로드 완료 ({len(self.long_term_memory)}개 교환)")
+        except Exception as e:
+            logger.error(f"❌ 장기 기억 로드 실패: {e}")
+            self.long_term_memory = None
+    
+    async def backfill_long_term_memory(self):
+        """
+        로컬 저장 파일에 없는 날짜(서버 재배포 등)를 최근 memory_backfill_days일만
+        Firestore에서 한 번씩 읽어서 장기 기억에 채움
+        
+        서버 시작을 막지 않도록 백그라운드 태스크로 실행하고, 읽기마다 Firestore
+        서킷 브레이커와 제한 시간을 거침 (브레이커가 열리거나 실패하면 중단)
+        """
+        if self.long_term_memory is None or not self.db:
+            return
+        
+        kst = ZoneInfo("Asia/Seoul")
+        today = datetime.now(kst)
+        backfilled = 0
+        for days_ago in range(self.memory_backfill_days):
+            date = (today - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+            if self.long_term_memory.has_date(date):
+                continue
+            try:
+                doc_ref = self.db.collection('chat_history').document(date)
+                doc = await self._firestore_get(doc_ref)
+            except CircuitOpenError:
+                logger.warning("⚠️ Firestore 서킷 브레이커 열림 - 장기 기억 백필 중단")
+                break
+            except Exception as e:
+                logger.error(f"❌ 장기 기억 백필 실패 ({date}): {e!r}")
+                break
+            # 읽는 동안 새 메시지가 저장된 날짜는 중복되지 않도록 건너뜀
+            if doc.exists and not self.long_term_memory.has_date(date):
+                messages = [msg for msg in doc.to_dict().get('messages', []) if not msg.get('fallback')]
+                self.long_term_memory.add_day(date, messages)
+                backfilled += len(messages)
+        if backfilled:
+            logger.info(f"✅ 장기 기억 백필 완료 ({backfilled}개 메시지)")
+    
+    async def _firestore_get(self, doc_ref):
+        """
+        Firestore 문서 1개 읽기 (서킷 브레이커 + 제한 시간)
+        
+        SDK에도 timeout을 넘기고 자체 재시도(기본 최대 120초)는 꺼서, 제한 시간이 지나면
+        스레드에서 실행 중인 RPC도 함께 끝나도록 함
+        """
+        get = functools.partial(doc_ref.get, retry=None, timeout=self.firestore_timeout)
+        return await self.firestore_breaker.call(get, timeout=self.firestore_timeout)
+    
+    def _get_fallback_reply(self, message: str) -> str:
+        """
+        AI 응답을 받지 못했을 때 돌려줄 답장
+        
+        학습 데이터에서 가장 비슷한 발화에 대한 나무의 실제 답장을 찾고,
+        찾지 못하면 기본 오류 메시지 반환 (둘 다 FallbackReply로 표시)
+        """
+        if self.fallback_responder:
+            try:
+                reply = self.fallback_responder.respond(message)
+                if reply:
+                    logger.info("🔁 fallback 응답기 답장 사용")
+                    return FallbackReply(reply)
+            except Exception as e:
+                logger.error(f"❌ fallback 응답 검색 실패: {e}")
+        return FallbackReply(DEFAULT_ERROR_MESSAGE)
+    
     def _get_today_date(self) -> str:
         """오늘 날짜를 YYYY-MM-DD 형식으로 반환 (한국 시간)"""
         kst = ZoneInfo("Asia/Seoul")
         return datetime.now(kst).strftime("%Y-%m-%d")
     
-    async def save_message(self, role: str, content: str, date: str = None):
+    async def save_message(self, role: str, content: str, date: str = None, fallback: bool = False):
         """
-        메시지를 Firestore에 저장
+        메시지를 Firestore에 저장 (장기 기억 인덱스에도 함께 추가)
         
         Parameters:
         - role: "user" 또는 "assistant"
         - content: 메시지 내용
         - date: 저장할 날짜 (기본값: 오늘)
+        - fallback: True면 AI 응답 대신 보낸 fallback 답장
+                    (Firestore에는 fallback 표시와 함께 남기고, 장기 기억/대화 기록에는 넣지 않음)
         """
+        date = date or self._get_today_date()
+        if not fallback:
+            self._remember_message(role, content, date)
+            self._append_local_history(date, role, content)
+        
         if not self.db:
             logger.warning("⚠️ Firestore가 초기화되지 않아 메시지를 저장할 수 없습니다")
             return
         
         try:
-            date = date or self._get_today_date()
             doc_ref = self.db.collection('chat_history').document(date)
             
             kst = ZoneInfo("Asia/Seoul")
@@ -114,23 +244,76 @@ Example:
                 "content": content,
                 "timestamp": datetime.now(kst).isoformat()
             }
+            if fallback:
+                message_data["fallback"] = True
             
-            # 문서가 이미 존재하면 messages 배열에 추가, 없으면 새로 생성
-            doc = doc_ref.get()
-            if doc.exists:
-                doc_ref.update({
-                    "messages": firestore.ArrayUnion([message_data])
-                })
-            else:
-                doc_ref.set({
-                    "date": date,
-                    "messages": [message_data],
-                    "created_at": datetime.now(kst).isoformat()
-                })
+            def write():
+                # 읽기 + 쓰기 RPC 2번이 합쳐서 firestore_timeout 안에 끝나도록 남은 시간만 넘김
+                # (SDK 자체 재시도는 끄고 브레이커에서 실패로 집계)
+                deadline = time.monotonic() + self.firestore_timeout
+
+                def remaining():
+                    return max(deadline - time.monotonic(), 0.1)
+
+                # 문서가 이미 존재하면 messages 배열에 추가, 없으면 새로 생성
+                doc = doc_ref.get(retry=None, timeout=remaining())
+                if doc.exists:
+                    doc_ref.update({
+                        "messages": firestore.ArrayUnion([message_data])
+                    }, retry=None, timeout=remaining())
+                else:
+                    doc_ref.set({
+                        "date": date,
+                        "messages": [message_data],
+                        "created_at": datetime.now(kst).isoformat()
+                    }, retry=None, timeout=remaining())
             
+            await self.firestore_breaker.call(write, timeout=self.firestore_timeout)
             logger.info(f"✅ 메시지 저장 완료: {role} - {date}")
+        except CircuitOpenError:
+            logger.warning(f"⚠️ Firestore 서킷 브레이커 열림 - 메시지 저장 생략: {role} - {date}")
+        except Exception as e:
+            logger.error(f"❌ 메시지 저장 실패: {e!r}")
+    
+    def _append_local_history(self, date: str, role: str, content: str):
+        """로컬 오늘 대화 기록에 메시지 추가 (날짜가 바뀌면 이전 기록은 버림)"""
+        if self._local_history["date"] != date:
+            self._local_history = {"date": date, "messages": []}
+        self._local_history["messages"].append({"role": role, "content": content})
+    
+    def _get_local_history(self, date: str) -> list:
+        """Firestore 대신 쓸 로컬 대화 기록"""
+        if self._local_history["date"] != date:
+            return []
+        return list(self._local_history["messages"])
+    
+    def _remember_message(self, role: str, content: str, date: str):
+        """장기 기억 인덱스에 메시지 추가 (실패해도 대화 흐름은 계속 진행)"""
+        if self.long_term_memory is None:
+            return
+        try:
+            kst = ZoneInfo("Asia/Seoul")
+            self.long_term_memory.add(role, content, date, datetime.now(kst).isoformat())
         except Exception as e:
-            logger.error(f"❌ 메시지 저장 실패: {e}")
+            logger.error(f"❌ 장기 기억 추가 실패: {e}")
+    
+    def recall_memories(self, message: str) -> list:
+        """
+        현재 발화와 충분히 관련 있는 지난 날짜의 대화 교환 검색
+        
+        Parameters:
+        - message: 사용자 메시지
+        
+        Returns:
+        - records: [{"date", "user", "assistant", "timestamp"}, ...] (최대 memory_top_k개, 관련 없으면 빈 리스트)
+        """
+        if self.long_term_memory is None:
+            return []
+        try:
+            return self.long_term_memory.search(message, exclude_date=self._get_today_date())
+        except Exception as e:
+            logger.error(f"❌ 장기 기억 검색 실패: {e}")
+            return []
     
     async def get_chat_history(self, date: str = None) -> list:
         """
@@ -142,32 +325,46 @@ Example:
         Returns:
         - messages: [{"role": "user", "content": "..."}, ...]
         """
+        date = date or self._get_today_date()
+        
         if not self.db:
-            logger.warning("⚠️ Firestore가 초기화되지 않아 대화 기록을 가져올 수 없습니다")
-            return []
+            logger.warning("⚠️ Firestore가 초기화되지 않아 로컬 대화 기록을 사용합니다")
+            return self._get_local_history(date)
         
         try:
-            date = date or self._get_today_date()
             doc_ref = self.db.collection('chat_history').document(date)
-            doc = doc_ref.get()
+            doc = await self._firestore_get(doc_ref)
             
             if doc.exists:
                 data = doc.to_dict()
                 messages = data.get('messages', [])
                 logger.info(f"✅ 대화 기록 로드 완료: {date} ({len(messages)}개 메시지)")
                 # timestamp 필드 제거하고 반환 (OpenAI API에는 role과 content만 필요)
-                return [{"role": msg["role"], "content": msg["content"]} for msg in messages]
+                # fallback 답장은 나무가 한 말처럼 다시 프롬프트에 들어가지 않도록 제외
+                history = [
+                    {"role": msg["role"], "content": msg["content"]}
+                    for msg in messages if not msg.get("fallback")
+                ]
             else:
                 logger.info(f"📝 {date}의 대화 기록이 없습니다 (새로운 대화 시작)")
-                return []
+                history = []
+            
+            # Firestore 기록으로 로컬 기록 갱신 (이후 장애 시 사용)
+            self._local_history = {"date": date, "messages": list(history)}
+            return history
+        except CircuitOpenError:
+            logger.warning("⚠️ Firestore 서킷 브레이커 열림 - 로컬 대화 기록 사용")
+            return self._get_local_history(date)
         except Exception as e:
-            logger.error(f"❌ 대화 기록 로드 실패: {e}")
-            return []
+            logger.error(f"❌ 대화 기록 로드 실패 - 로컬 대화 기록 사용: {e!r}")
+            return self._get_local_history(date)
     
     async def get_message_from_namuna(
         self, 
         message: str,
         chat_history: list = None,
+        memories: list = None,
+        deadline: float = None,
     ) -> str:
         """
         AI 응답 생성 (대화 기록 포함)
@@ -175,13 +372,24 @@ Example:
         Parameters:
         - message: 사용자 메시지
         - chat_history: 이전 대화 기록 (선택사항)
+        - memories: recall_memories로 찾은 지난 날짜 기억 (선택사항)
+        - deadline: time.monotonic() 기준 응답 마감 시각 (선택사항, 콜백 마감 등)
+                    한도 대기 순서도 이 마감이 가까운 요청부터 처리됨
+                    (실제 대기/응답 제한은 이 마감과 response_deadline 중 빠른 쪽)
         
         Returns:
-        - AI 응답
+        - AI 응답 (응답을 받지 못했으면 FallbackReply)
         """
-        # 대화 리스트 구성: system prompt + 이전 대화 기록 + 현재 메시지
+        # 대화 리스트 구성: system prompt + 지난 기억 + 이전 대화 기록 + 현재 메시지
         previous_chat_list = [{"role": "system", "content": self.system_prompt}]
         
+        # 관련 있는 지난 날짜 기억이 있으면 system 메시지로 추가
+        if memories and self.long_term_memory is not None:
+            previous_chat_list.append({
+                "role": "system",
+                "content": "지난 대화 기억 (관련 있을 때만 자연스럽게 참고):\n" + self.long_term_memory.format_snippets(memories)
+            })
+        
         # 대화 기록이 있으면 추가
         if chat_history:
             previous_chat_list.extend(chat_history)
@@ -189,19 +397,61 @@ Example:
         # 현재 사용자 메시지 추가
         previous_chat_list.append({"role": "user", "content": message})
         
-        logger.info(f"💬 총 {len(previous_chat_list)}개 메시지로 AI 요청 (system + 기록 {len(chat_history) if chat_history else 0}개 + 현재 1개)")
+        logger.info(f"💬 총 {len(previous_chat_list)}개 메시지로 AI 요청 (system + 기억 {len(memories) if memories else 0}개 + 기록 {len(chat_history) if chat_history else 0}개 + 현재 1개)")
+
+        # 한도 계산용 예상 토큰 (보낼 대화 기록 전체 + 예상 응답)
+        estimated_tokens = count_message_tokens(previous_chat_list, include_reply_priming=True) + self.completion_token_estimate
+        
+        # 콜백 마감은 한도 대기 순서에만 쓰고, 대기/응답 제한은 자체 제한 시간과 비교해서 빠른 쪽
+        # (콜백 마감이 보통 더 늦으므로 둘을 합치면 순서가 요청 시작 시각 순으로 바뀜)
+        priority = deadline
+        own_deadline = time.monotonic() + self.response_deadline
+        deadline = min(deadline, own_deadline) if deadline else own_deadline
 
         for attempt in range(self.max_retries):
+            # OpenAI 장애로 브레이커가 열려 있으면 기다리지 않고 바로 fallback
+            if not self.openai_breaker.allow_request():
+                logger.warning("⚠️ OpenAI 서킷 브레이커 열림 - fallback 답장 반환")
+                return self._get_fallback_reply(message)
+            
+            # 요청/토큰 한도 확보 (부족하면 대기, 마감까지 안 되면 fallback)
             try:
-                logger.info(f"AI 응답 생성 시도 {attempt + 1}/{self.max_retries}")
+                acquired = await self.rate_limiter.acquire(estimated_tokens, deadline, priority=priority)
+            except BaseException:
+                # 대기 중 취소되면 half_open 시험 호출 자리를 돌려줘야 브레이커가 멈추지 않음
+                self.openai_breaker.release()
+                raise
+            if not acquired:
+                self.openai_breaker.release()
+                logger.error("❌ 마감 전 OpenAI 한도 확보 실패 - fallback 답장 반환")
+                return self._get_fallback_reply(message)
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.openai_breaker.release()
+                logger.error("❌ 응답 제한 시간 초과 - fallback 답장 반환")
+                return self._get_fallback_reply(message)
+            
+            started_at = time.monotonic()
+            try:
+                logger.info(f"AI 응답 생성 시도 {attempt + 1}/{self.max_retries} (예상 {estimated_tokens} 토큰)")
                 
-                # 비동기로 OpenAI API 호출
-                completion = await asyncio.to_thread(
-                    self.client.chat.completions.create,
-                    model=self.model,
-                    temperature=self.temperature,
-                    messages=previous_chat_list,
+                # 비동기로 OpenAI API 호출 (남은 제한 시간까지만 대기)
+                # timeout을 SDK에도 넘겨서 제한 시간이 지나면 HTTP 요청 자체를 끊음
+                # 한도 헤더를 읽기 위해 raw response로 받은 뒤 parse
+                raw_response = await asyncio.wait_for(
+                    asyncio.to_thread(
+                        self.client.chat.completions.with_raw_response.create,
+                        model=self.model,
+                        temperature=self.temperature,
+                        messages=previous_chat_list,
+                        timeout=remaining,
+                    ),
+                    timeout=remaining,
                 )
+                self.rate_limiter.update_from_headers(raw_response.headers)
+                completion = raw_response.parse()
+                self.openai_breaker.record_success(time.monotonic() - started_at)
                 
                 response = completion.choices[0].message.content
                 logger.info(f"✅ 응답 성공 생성")
@@ -210,33 +460,59 @@ Example:
                 return response
                 
             except Exception as e:
-                logger.error(f"❌ 응답 생성 실패 (시도 {attempt + 1}/{self.max_retries}): {e}")
+                logger.error(f"❌ 응답 생성 실패 (시도 {attempt + 1}/{self.max_retries}): {e!r}")
+                
+                # 429는 장애가 아니라 한도 문제이므로 브레이커 실패로 집계하지 않음
+                # 마지막 시도였더라도 다른 요청들이 한도 초기화 시각까지 기다리도록 항상 반영
+                if isinstance(e, RateLimitError):
+                    self.openai_breaker.release()
+                    self.rate_limiter.penalize(e.response.headers)
+                else:
+                    self.openai_breaker.record_failure(time.monotonic() - started_at)
                 
                 if attempt < self.max_retries - 1:
                     logger.info("재시도 중...")
-                    await asyncio.sleep(1)  # 1초 대기 후 재시도
+                    if not isinstance(e, RateLimitError):
+                        # 1초 대기 후 재시도 (남은 제한 시간을 넘기지 않도록)
+                        # 429는 다음 acquire에서 한도 초기화 시각까지 대기
+                        await asyncio.sleep(max(0, min(1, deadline - time.monotonic())))
                     continue
                 else:
                     # 최종 실패
-                    logger.error(f"❌ 최종 실패 - 기본 메시지 반환")
-                    return "나무나 오류 발생.. 나무 너 큰일났다 이제.. 이쁘니 사랑해"
+                    logger.error(f"❌ 최종 실패 - fallback 답장 반환")
+                    return self._get_fallback_reply(message)
+            except BaseException:
+                # 요청 처리 중 취소(CancelledError)되면 결과를 알 수 없으므로 집계하지 않고 자리만 반환
+                self.openai_breaker.release()
+                raise
         
         # 이 부분은 도달하지 않지만, 타입 체커를 위해 추가
-        return "(오류가 발생했습니다)"
+        return self._get_fallback_reply(message)
+    
+    def get_health_status(self) -> dict:
+        """모니터링용 의존성 상태 (서킷 브레이커 + OpenAI 한도)"""
+        return {
+            "circuit_breakers": {
+                "firestore": self.firestore_breaker.snapshot(),
+                "openai": self.openai_breaker.snapshot(),
+            },
+            "rate_limit": self.rate_limiter.snapshot(),
+        }
     
-    async def chat_with_history(self, user_message: str) -> str:
+    async def chat_with_history(self, user_message: str, deadline: float = None) -> str:
         """
         대화 기록을 관리하면서 AI 응답 생성
         
         흐름:
         1. 사용자 메시지 저장
-        2. 오늘의 대화 기록 불러오기
+        2. 오늘의 대화 기록 불러오기 + 관련 있는 지난 날짜 기억 검색
         3. AI 응답 생성
         4. AI 응답 저장
         5. 응답 반환
         
         Parameters:
         - user_message: 사용자 메시지
+        - deadline: time.monotonic() 기준 응답 마감 시각 (선택사항, 콜백 마감)
         
         Returns:
         - AI 응답
@@ -249,14 +525,15 @@ Example:
             # 2. 오늘의 대화 기록 불러오기 (방금 저장한 메시지 제외)
             logger.info("2️⃣ 대화 기록 불러오는 중...")
             chat_history = await self.get_chat_history()
+            memories = self.recall_memories(user_message)
             
-            # 3. AI 응답 생성 (대화 기록 포함)
+            # 3. AI 응답 생성 (대화 기록 + 지난 기억 포함)
             logger.info("3️⃣ AI 응답 생성 중...")
-            ai_response = await self.get_message_from_namuna(user_message, chat_history)
+            ai_response = await self.get_message_from_namuna(user_message, chat_history, memories, deadline)
             
-            # 4. AI 응답 저장
+            # 4. AI 응답 저장 (fallback 답장은 표시만 하고 기억/대화 기록에서 제외)
             logger.info("4️⃣ AI 응답 저장 중...")
-            await self.save_message("assistant", ai_response)
+            await self.save_message("assistant", ai_response, fallback=isinstance(ai_response, FallbackReply))
             
             # 5. 응답 반환
             logger.info("5️⃣ 응답 반환 완료")
@@ -264,7 +541,7 @@ Example:
             
         except Exception as e:
             logger.error(f"❌ chat_with_history 실패: {e}")
-            return "나무나 오류 발생.. 나무 너 큰일났다 이제.. 이쁘니 사랑해"
+            return self._get_fallback_reply(user_message)
 
 
 # ============================================================================
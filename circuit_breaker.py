@@ -0,0 +1,220 @@
+# circuit_breaker.py
+#
+# 외부 의존성(Firestore, OpenAI)별 서킷 브레이커
+# - closed: 정상 호출, 최근 window_size개 호출의 실패율/지연 비율을 기록
+# - open: 실패율 또는 느린 호출 비율이 기준을 넘으면 open_seconds 동안 호출하지 않고 바로 실패
+# - half_open: open_seconds가 지나면 소수의 시험 호출만 허용해서 복구 여부 확인
+#   (시험 호출이 모두 성공하면 closed, 하나라도 실패하거나 half_open_timeout 안에 끝나지 않으면 다시 open)
+
+import time
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger("namuna-chat")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """브레이커가 열려 있어서 호출하지 않고 바로 실패"""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name} 서킷 브레이커 열림")
+        self.name = name
+
+
+class CircuitBreaker:
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 5.0,
+        slow_call_rate_threshold: float = 0.8,
+        window_size: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+        half_open_timeout: float = 60.0,
+    ):
+        """
+        Parameters:
+        - name: 의존성 이름 (로그/모니터링용)
+        - failure_rate_threshold: 이 비율 이상 실패하면 open
+        - slow_call_seconds: 이 시간 이상 걸린 호출은 느린 호출로 집계
+        - slow_call_rate_threshold: 느린 호출이 이 비율 이상이면 open
+        - window_size: 비율 계산에 쓰는 최근 호출 수
+        - min_calls: 이 개수 이상 기록된 뒤부터 비율 판단
+        - open_seconds: open 상태 유지 시간 (지나면 half_open)
+        - half_open_max_calls: half_open에서 허용할 시험 호출 수
+        - half_open_timeout: 시험 호출이 이 시간 안에 끝나지 않으면 실패로 보고 다시 open
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.half_open_timeout = half_open_timeout
+
+        self.state = CLOSED
+        self.opened_at = None
+        self._outcomes = deque(maxlen=window_size)  # (실패 여부, 느린 호출 여부)
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self._probe_started_at = None  # 가장 최근 시험 호출 시작 시각
+
+        # 모니터링용 누적 카운터
+        self.total_calls = 0
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.times_opened = 0
+
+    def _transition(self, state: str):
+        if self.state == state:
+            return
+        logger.warning(f"🔌 {self.name} 서킷 브레이커: {self.state} → {state}")
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+        elif state == CLOSED:
+            self.opened_at = None
+            self._outcomes.clear()
+        if state == HALF_OPEN:
+            self._half_open_in_flight = 0
+            self._half_open_successes = 0
+            self._probe_started_at = None
+
+    def _update_state(self, now: float):
+        """시간 경과에 따른 상태 전환 (open → half_open, 끝나지 않는 시험 호출 → open)"""
+        if self.state == OPEN and now - self.opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+        elif (
+            self.state == HALF_OPEN
+            and self._half_open_in_flight > 0
+            and now - self._probe_started_at >= self.half_open_timeout
+        ):
+            logger.error(f"❌ {self.name} 시험 호출이 {self.half_open_timeout:g}초 안에 끝나지 않음 - 다시 호출 차단")
+            self._transition(OPEN)
+
+    def allow_request(self) -> bool:
+        """
+        지금 호출해도 되는지 확인 (True면 호출 후 반드시 record_* 또는 release 중 하나를 호출)
+        """
+        now = time.monotonic()
+        self._update_state(now)
+
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+            self._half_open_in_flight += 1
+            self._probe_started_at = now
+            return True
+
+        self.total_rejected += 1
+        return False
+
+    def _failure_rates(self):
+        calls = len(self._outcomes)
+        if calls == 0:
+            return 0.0, 0.0
+        failures = sum(1 for failed, _ in self._outcomes if failed)
+        slow = sum(1 for _, is_slow in self._outcomes if is_slow)
+        return failures / calls, slow / calls
+
+    def _record(self, failed: bool, latency: float = None):
+        is_slow = latency is not None and latency >= self.slow_call_seconds
+        self.total_calls += 1
+        if failed:
+            self.total_failures += 1
+
+        if self.state == HALF_OPEN:
+            self._half_open_in_flight = max(self._half_open_in_flight - 1, 0)
+            if failed or is_slow:
+                self._transition(OPEN)
+                return
+            self._half_open_successes += 1
+            if self._half_open_successes >= self.half_open_max_calls:
+                self._transition(CLOSED)
+            return
+
+        if self.state != CLOSED:
+            # open 상태에서 끝난 늦은 호출 결과는 판단에 쓰지 않음
+            return
+
+        self._outcomes.append((failed, is_slow))
+        if len(self._outcomes) < self.min_calls:
+            return
+        failure_rate, slow_rate = self._failure_rates()
+        if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+            logger.error(
+                f"❌ {self.name} 장애 감지 (실패율 {failure_rate:.0%}, 느린 호출 {slow_rate:.0%}) - "
+                f"{self.open_seconds:g}초 동안 호출 차단"
+            )
+            self._transition(OPEN)
+
+    def record_success(self, latency: float = None):
+        self._record(False, latency)
+
+    def record_failure(self, latency: float = None):
+        self._record(True, latency)
+
+    def release(self):
+        """성공/실패로 집계하지 않을 결과 (예: 429 한도 초과, 호출 취소) - half_open 시험 호출 자리만 반환"""
+        if self.state == HALF_OPEN:
+            self._half_open_in_flight = max(self._half_open_in_flight - 1, 0)
+
+    async def call(self, func, *args, timeout: float = None, **kwargs):
+        """
+        동기 함수를 스레드에서 실행하면서 결과를 브레이커에 기록
+
+        Parameters:
+        - func: 실행할 동기 함수 (예: Firestore 호출)
+        - timeout: 최대 대기 시간 (초, 넘으면 실패로 기록하고 TimeoutError)
+
+        Raises:
+        - CircuitOpenError: 브레이커가 열려 있어서 호출하지 않음
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(self.name)
+
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(asyncio.to_thread(func, *args, **kwargs), timeout)
+        except Exception:
+            self.record_failure(time.monotonic() - start)
+            raise
+        except BaseException:
+            # 취소(CancelledError) 등으로 결과를 알 수 없으면 집계하지 않고 자리만 반환
+            # (반환하지 않으면 half_open 시험 호출 자리가 계속 차 있어서 브레이커가 멈춤)
+            self.release()
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    def snapshot(self) -> dict:
+        """모니터링용 현재 상태"""
+        # 시간 경과에 따른 상태만 갱신 (시험 호출 자리는 쓰지 않음)
+        self._update_state(time.monotonic())
+
+        failure_rate, slow_rate = self._failure_rates()
+        return {
+            "state": self.state,
+            "failure_rate": round(failure_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+            "window_calls": len(self._outcomes),
+            "open_remaining_seconds": (
+                round(max(self.open_seconds - (time.monotonic() - self.opened_at), 0.0), 1)
+                if self.state == OPEN else 0.0
+            ),
+            "total_calls": self.total_calls,
+            "total_failures": self.total_failures,
+            "total_rejected": self.total_rejected,
+            "times_opened": self.times_opened,
+        }
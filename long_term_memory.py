@@ -0,0 +1,186 @@
+# long_term_memory.py
+#
+# 날짜를 넘어서는 장기 기억
+# - save_message가 저장하는 메시지를 로컬 JSONL에 한 줄씩 추가하고,
+#   이쁘니 발화 → 나무 답장 한 쌍(교환)이 완성될 때마다 BM25 역색인에 추가
+# - 매 턴마다 현재 발화와 충분히 관련 있는 지난 날짜의 교환 top-k개만 프롬프트에 넣음
+#   (며칠치 대화 전체를 불러오지 않으므로 프롬프트 크기와 Firestore 읽기가 늘어나지 않음)
+
+import os
+import json
+import logging
+
+from retrieval import BM25Index
+
+logger = logging.getLogger("namuna-chat")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MEMORY_PATH = os.path.join(BASE_DIR, "memory_data", "long_term_memory.jsonl")
+
+ROLE_LABELS = {"user": "이쁘니", "assistant": "나무"}
+
+
+class LongTermMemory:
+    """
+    지난 대화 교환(user → assistant) 검색용 로컬 증분 인덱스
+
+    - add(): 메시지 1개를 파일에 추가하고, 교환이 완성되면 인덱스에 반영
+    - search(): 질의와 충분히 관련 있는 교환 top-k 반환 (오늘 날짜는 이미 대화 기록에 있으므로 제외 가능)
+    """
+
+    def __init__(
+        self,
+        store_path: str = None,
+        top_k: int = 3,
+        max_snippet_chars: int = 200,
+        min_matched_grams: int = 2,
+        min_coverage: float = 0.5
+    ):
+        """
+        Parameters:
+        - store_path: 메시지 저장 파일 경로 (인자 > 환경변수 NAMUNA_MEMORY_PATH > 기본 경로)
+        - top_k: 검색 결과 최대 개수
+        - max_snippet_chars: 프롬프트에 넣을 메시지당 최대 글자 수
+        - min_matched_grams: 질의와 겹치는 n-gram이 이 개수 미만이면 관련 없음으로 처리
+        - min_coverage: 인덱스에 있는 질의 n-gram(IDF 가중) 중 겹치는 비율이 이 값 미만이면 관련 없음으로 처리
+        """
+        self.store_path = store_path or os.getenv("NAMUNA_MEMORY_PATH") or DEFAULT_MEMORY_PATH
+        self.top_k = top_k
+        self.max_snippet_chars = max_snippet_chars
+        self.min_matched_grams = min_matched_grams
+        self.min_coverage = min_coverage
+
+        self.index = BM25Index(ngram_size=2)
+        self.records = []  # doc_id 순서대로 {"date", "user", "assistant", "timestamp"}
+        self.date_counts = {}  # 날짜별 색인된 교환 수
+        self.dates = set()  # 메시지가 하나라도 있는 날짜
+        self._pending_user = {}  # 날짜 → 아직 답장이 없는 이쁘니 발화
+
+        self._load()
+
+    def __len__(self):
+        return len(self.records)
+
+    def _load(self):
+        """저장된 메시지 파일을 읽어서 인덱스 재구성"""
+        if not os.path.exists(self.store_path):
+            return
+
+        with open(self.store_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    self._index_message(record["role"], record["content"], record["date"], record.get("timestamp"))
+                except (json.JSONDecodeError, KeyError) as e:
+                    # 쓰다가 중단된 마지막 줄 등은 건너뜀
+                    logger.warning(f"⚠️ 장기 기억 레코드 스킵: {e}")
+
+    def _index_message(self, role: str, content: str, date: str, timestamp: str = None):
+        """
+        메시지를 교환 단위로 묶어서 색인
+
+        - 연속된 이쁘니 발화는 하나로 합침 (학습 데이터 만들 때와 같은 방식)
+        - 나무 답장이 오면 대기 중인 발화와 묶어서 교환 하나로 색인
+        - 앞선 발화 없는 나무 메시지는 답장만 있는 교환으로 색인
+        """
+        self.dates.add(date)
+
+        if role == "user":
+            pending = self._pending_user.get(date)
+            self._pending_user[date] = f"{pending}\n{content}" if pending else content
+            return
+
+        user_content = self._pending_user.pop(date, None)
+        record = {"date": date, "user": user_content, "assistant": content, "timestamp": timestamp}
+        self.index.add(f"{user_content}\n{content}" if user_content else content)
+        self.records.append(record)
+        self.date_counts[date] = self.date_counts.get(date, 0) + 1
+
+    def has_date(self, date: str) -> bool:
+        return date in self.dates
+
+    def add(self, role: str, content: str, date: str, timestamp: str = None):
+        """
+        메시지 1개를 장기 기억에 추가
+
+        Parameters:
+        - role: "user" 또는 "assistant"
+        - content: 메시지 내용
+        - date: 메시지 날짜 (YYYY-MM-DD)
+        - timestamp: 메시지 시각 (ISO 형식, 선택사항)
+        """
+        record = {"date": date, "role": role, "content": content, "timestamp": timestamp}
+
+        directory = os.path.dirname(self.store_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.store_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+        self._index_message(role, content, date, timestamp)
+
+    def add_day(self, date: str, messages: list):
+        """
+        하루치 메시지를 한 번에 추가 (Firestore 백필용)
+
+        Parameters:
+        - date: 날짜 (YYYY-MM-DD)
+        - messages: [{"role", "content", "timestamp"}, ...]
+        """
+        for msg in messages:
+            self.add(msg["role"], msg["content"], date, msg.get("timestamp"))
+
+    def search(self, query: str, exclude_date: str = None, top_k: int = None) -> list:
+        """
+        질의와 관련 있는 지난 교환 검색
+
+        겹치는 n-gram이 min_matched_grams개 미만이거나 질의 대비 겹치는 비율이
+        min_coverage 미만인 교환은 관련 없음으로 보고 제외 (아무것도 없으면 빈 리스트)
+
+        Parameters:
+        - query: 현재 사용자 발화
+        - exclude_date: 제외할 날짜 (보통 오늘 - 이미 대화 기록으로 들어가 있음)
+        - top_k: 반환할 최대 개수 (기본값: self.top_k)
+
+        Returns:
+        - records: [{"date", "user", "assistant", "timestamp"}, ...] 관련도 순
+        """
+        top_k = top_k or self.top_k
+        # 제외할 날짜의 교환이 모두 상위에 와도 top_k개를 채울 수 있도록 그만큼 더 검색
+        search_k = top_k + self.date_counts.get(exclude_date, 0)
+
+        hits = self.index.search(
+            query,
+            top_k=search_k,
+            min_matched_grams=self.min_matched_grams,
+            min_coverage=self.min_coverage
+        )
+
+        results = []
+        for doc_id, _ in hits:
+            record = self.records[doc_id]
+            if record["date"] == exclude_date:
+                continue
+            results.append(record)
+            if len(results) >= top_k:
+                break
+        return results
+
+    def _truncate(self, content: str) -> str:
+        content = content.replace('\n', ' ')
+        if len(content) > self.max_snippet_chars:
+            content = content[:self.max_snippet_chars] + "…"
+        return content
+
+    def format_snippets(self, records: list) -> str:
+        """검색된 교환을 system 프롬프트에 넣을 문자열로 변환"""
+        lines = []
+        for record in records:
+            parts = []
+            if record["user"]:
+                parts.append(f"{ROLE_LABELS['user']}: {self._truncate(record['user'])}")
+            parts.append(f"{ROLE_LABELS['assistant']}: {self._truncate(record['assistant'])}")
+            lines.append(f"- [{record['date']}] " + " / ".join(parts))
+        return '\n'.join(lines)
@@ -5,6 +5,7 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 import uvicorn
 import logging
 import httpx
+import time
 import asyncio
 from chat import NamunaChat
 
@@ -12,6 +13,11 @@ app = FastAPI()
 
 # NamunaChat 전역 인스턴스
 namuna_chat = None
+# 장기 기억 백필 백그라운드 태스크 (가비지 컬렉션으로 중단되지 않도록 참조 유지)
+memory_backfill_task = None
+
+# 카카오 콜백 URL 유효 시간(1분)에서 콜백 전송 여유 시간을 뺀 AI 응답 마감 (초)
+CALLBACK_RESPONSE_DEADLINE = 50.0
 
 # CORS 설정
 app.add_middleware(
@@ -36,7 +42,7 @@ logging.getLogger("openai").setLevel(logging.WARNING)
 # 시작 이벤트: NamunaChat 초기화
 @app.on_event("startup")
 async def startup_event():
-    global namuna_chat
+    global namuna_chat, memory_backfill_task
     logger.info("🚀 서버 시작: NamunaChat 초기화 중...")
     try:
         namuna_chat = NamunaChat()
@@ -44,6 +50,8 @@ async def startup_event():
     except Exception as e:
         logger.error(f"❌ NamunaChat 초기화 실패: {e}")
         raise
+    # Firestore 읽기가 서버 시작을 막지 않도록 백그라운드에서 진행
+    memory_backfill_task = asyncio.create_task(namuna_chat.backfill_long_term_memory())
 
 
 # 로깅 미들웨어
@@ -96,6 +104,7 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
                 "message": f"경로를 찾을 수 없습니다: {request.method} {request.url.path}",
                 "available_endpoints": [
                     {"method": "POST", "path": "/api/namuna_chat", "description": "나무나 AI 챗봇 (콜백 방식)"},
+                    {"method": "GET", "path": "/api/health", "description": "서킷 브레이커 / OpenAI 한도 상태"},
                 ],
                 "tip": "API 문서를 보려면 /docs 로 접속하세요"
             }
@@ -138,8 +147,9 @@ async def namuna_chat_callback(request: Request, background_tasks: BackgroundTas
                 }
             })
         
-        # 백그라운드 작업으로 콜백 처리 등록
-        background_tasks.add_task(process_callback, callback_url, user_message)
+        # 백그라운드 작업으로 콜백 처리 등록 (요청 수신 시점 기준 마감 전달)
+        deadline = time.monotonic() + CALLBACK_RESPONSE_DEADLINE
+        background_tasks.add_task(process_callback, callback_url, user_message, deadline)
         
         # 즉시 응답 (useCallback: true)
         immediate_response = {
@@ -162,7 +172,7 @@ async def namuna_chat_callback(request: Request, background_tasks: BackgroundTas
 
 
 # 🔹 콜백 처리 함수 (백그라운드 작업)
-async def process_callback(callback_url: str, user_message: str):
+async def process_callback(callback_url: str, user_message: str, deadline: float = None):
     """
     시간이 걸리는 작업을 처리하고 결과를 callbackUrl로 전송
     
@@ -172,13 +182,15 @@ async def process_callback(callback_url: str, user_message: str):
     3. AI 응답 생성 (대화 기록 포함)
     4. AI 응답 저장
     5. 콜백 URL로 응답 전송
+    
+    deadline: time.monotonic() 기준 AI 응답 마감 시각 (OpenAI 한도 대기 우선순위에도 사용)
     """
     try:
         logger.info("🔧 백그라운드 작업 시작...")
         
         # NamunaChat으로 AI 응답 생성 (대화 기록 포함)
         # chat_with_history가 자동으로 저장/불러오기/AI 요청/저장을 수행
-        ai_response = await namuna_chat.chat_with_history(user_message)
+        ai_response = await namuna_chat.chat_with_history(user_message, deadline)
         logger.info(f"🤖 AI 응답 생성 완료: {ai_response[:50]}...")
         
         # 최종 응답 데이터 생성
@@ -212,6 +224,18 @@ async def process_callback(callback_url: str, user_message: str):
         logger.error(f"❌ 콜백 처리 중 에러 발생: {str(e)}")
 
 
+# 🔹 모니터링 엔드포인트 (Firestore/OpenAI 서킷 브레이커 상태, OpenAI 한도 추정치)
+@app.get("/api/health")
+async def health():
+    if namuna_chat is None:
+        return JSONResponse(status_code=503, content={"status": "initializing"})
+    
+    status = namuna_chat.get_health_status()
+    breaker_states = [breaker["state"] for breaker in status["circuit_breakers"].values()]
+    status["status"] = "ok" if all(state == "closed" for state in breaker_states) else "degraded"
+    return JSONResponse(status_code=200, content=status)
+
+
 # 🔹 콜백 응답 수신용 엔드포인트 (테스트용 - 실제로는 카카오 서버가 처리)
 # @app.post("/callback/result")
 # async def callback_result(request: Request):
@@ -233,6 +257,7 @@ if __name__ == "__main__":
     print(f"📖 API 문서: http://localhost:8000/docs")
     print("\n등록된 엔드포인트:")
     print("  - POST /api/namuna_chat (나무나 AI 챗봇 - 콜백 방식)")
+    print("  - GET  /api/health (서킷 브레이커 / OpenAI 한도 상태)")
     print("=" * 60 + "\n")
     
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
\ No newline at end of file
@@ -0,0 +1,258 @@
+# rate_limit.py
+#
+# OpenAI 요청/토큰 한도 관리 (429 방지)
+# - 응답 헤더(x-ratelimit-*)로 계정의 남은 요청 수/토큰 수와 초기화 시각을 동기화
+# - 다음 응답 전까지는 로컬 토큰 버킷으로 남은 양을 추정 (보낼 대화 기록의 프롬프트 토큰 포함)
+# - 한도가 부족하면 요청을 대기시키고, 대기 중인 요청은 콜백 마감이 가까운 순서로 처리
+
+import re
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+
+logger = logging.getLogger("namuna-chat")
+
+_DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset_duration(value):
+    """
+    OpenAI 헤더의 초기화 시간 문자열을 초 단위로 변환
+
+    예시:
+    - "1s" → 1.0
+    - "6m0s" → 360.0
+    - "20ms" → 0.02
+    - "1h2m3.5s" → 3723.5
+
+    Returns:
+    - 초 (파싱할 수 없으면 None)
+    """
+    if not value:
+        return None
+    matches = _DURATION_PATTERN.findall(value)
+    if not matches:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in matches)
+
+
+def _parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    분당 한도를 초당 일정 속도로 채우는 토큰 버킷
+
+    capacity가 None이면 한도를 아직 모르는 상태 (제한하지 않음)
+    """
+
+    def __init__(self, capacity: float = None, window_seconds: float = 60.0):
+        self.capacity = capacity
+        self.window_seconds = window_seconds
+        self.refill_rate = capacity / window_seconds if capacity else None
+        self.available = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.capacity is None:
+            return
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.available = min(self.capacity, self.available + elapsed * self.refill_rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """amount만큼 쓸 수 있을 때까지 남은 시간 (초, 지금 가능하면 0)"""
+        if self.capacity is None:
+            return 0.0
+        self._refill(now)
+        # 한도보다 큰 요청은 버킷이 가득 찼을 때 보내도록 허용
+        needed = min(amount, self.capacity) - self.available
+        if needed <= 0:
+            return 0.0
+        return needed / self.refill_rate
+
+    def consume(self, amount: float, now: float):
+        if self.capacity is None:
+            return
+        self._refill(now)
+        self.available -= amount
+
+    def sync(self, limit: int, remaining: int, reset_seconds: float, now: float):
+        """응답 헤더 값으로 버킷 상태를 덮어씀 (서버 값이 로컬 추정보다 정확함)"""
+        if limit:
+            self.capacity = limit
+            self.refill_rate = limit / self.window_seconds
+        if self.capacity is None or remaining is None:
+            return
+        self.available = remaining
+        self.updated_at = now
+        if reset_seconds and reset_seconds > 0 and remaining < self.capacity:
+            # 초기화 시각까지 한도가 가득 차도록 채우는 속도 보정
+            self.refill_rate = max(self.refill_rate, (self.capacity - remaining) / reset_seconds)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "capacity": self.capacity,
+            "available": round(self.available, 1) if self.available is not None else None,
+        }
+
+
+class RateLimitGovernor:
+    """
+    요청 수 / 토큰 수 버킷 2개로 OpenAI 호출 속도를 조절
+
+    사용법:
+    1. acquire(예상 토큰, 마감 시각) → True면 호출, False면 마감 전에 한도 확보 실패
+    2. 응답을 받으면 update_from_headers(headers)로 서버 값과 동기화
+    3. 429를 받으면 penalize(대기 시간)으로 해당 시간 동안 모든 요청 대기
+    """
+
+    def __init__(self, request_limit: int = None, token_limit: int = None):
+        self.requests = TokenBucket(request_limit)
+        self.tokens = TokenBucket(token_limit)
+        self.blocked_until = 0.0  # 429 이후 요청을 보내지 않을 monotonic 시각
+
+        self._waiters = []  # (우선순위, 순번) 힙 - 콜백 마감이 가까운 요청이 먼저
+        self._counter = itertools.count()
+        self._condition = None  # 이벤트 루프 안에서 처음 사용할 때 생성
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _wait_time(self, estimated_tokens: int, now: float) -> float:
+        return max(
+            self.blocked_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(estimated_tokens, now),
+            0.0,
+        )
+
+    async def acquire(self, estimated_tokens: int, deadline: float = None, priority: float = None) -> bool:
+        """
+        요청 1개 + estimated_tokens만큼 한도 확보
+
+        Parameters:
+        - estimated_tokens: 프롬프트 + 예상 응답 토큰 수
+        - deadline: time.monotonic() 기준 대기 마감 시각 (None이면 무기한 대기)
+        - priority: 대기 순서 기준 (작을수록 먼저, 보통 콜백 마감 시각 - None이면 deadline 사용)
+                    요청별 자체 제한 시간과 실제 콜백 마감이 다를 때 콜백 마감이 가까운 요청을 먼저 처리
+
+        Returns:
+        - True: 한도 확보 (바로 호출하면 됨)
+        - False: 마감까지 한도를 확보하지 못함 (호출하지 말고 fallback 처리)
+        """
+        condition = self._get_condition()
+        if priority is None:
+            priority = deadline if deadline is not None else float("inf")
+        entry = (priority, next(self._counter))
+
+        async with condition:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(estimated_tokens, now)
+                    is_first = self._waiters[0] == entry
+
+                    if is_first and wait <= 0:
+                        self.requests.consume(1, now)
+                        self.tokens.consume(estimated_tokens, now)
+                        return True
+
+                    if deadline is not None and now + (wait if is_first else 0) >= deadline:
+                        logger.warning(f"⚠️ 마감 전 OpenAI 한도 확보 실패 (필요 대기 {wait:.1f}초)")
+                        return False
+
+                    # 맨 앞이면 한도가 찰 때까지, 아니면 앞 요청이 처리될 때까지 대기
+                    timeout = wait if is_first else None
+                    if deadline is not None:
+                        remaining = deadline - now
+                        timeout = remaining if timeout is None else min(timeout, remaining)
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                # 다음 순서 요청이 바로 확인할 수 있도록 깨움
+                condition.notify_all()
+
+    def update_from_headers(self, headers):
+        """
+        OpenAI 응답 헤더로 버킷 동기화
+
+        사용하는 헤더:
+        - x-ratelimit-limit-requests / x-ratelimit-limit-tokens
+        - x-ratelimit-remaining-requests / x-ratelimit-remaining-tokens
+        - x-ratelimit-reset-requests / x-ratelimit-reset-tokens
+        """
+        if not headers:
+            return
+        now = time.monotonic()
+        self.requests.sync(
+            _parse_int(headers.get("x-ratelimit-limit-requests")),
+            _parse_int(headers.get("x-ratelimit-remaining-requests")),
+            parse_reset_duration(headers.get("x-ratelimit-reset-requests")),
+            now,
+        )
+        self.tokens.sync(
+            _parse_int(headers.get("x-ratelimit-limit-tokens")),
+            _parse_int(headers.get("x-ratelimit-remaining-tokens")),
+            parse_reset_duration(headers.get("x-ratelimit-reset-tokens")),
+            now,
+        )
+
+    def penalize(self, headers=None, default_seconds: float = 1.0) -> float:
+        """
+        429 응답을 받았을 때 초기화 시각까지 모든 요청을 멈춤
+
+        Returns:
+        - 대기할 시간 (초)
+        """
+        headers = headers or {}
+        candidates = []
+
+        retry_after_ms = parse_reset_duration(headers.get("retry-after-ms"))
+        if retry_after_ms:
+            candidates.append(retry_after_ms / 1000)
+        retry_after = parse_reset_duration(headers.get("retry-after"))
+        if retry_after:
+            candidates.append(retry_after)
+        # 다 써버린 쪽의 초기화 시간만 의미 있음
+        for kind in ("requests", "tokens"):
+            if headers.get(f"x-ratelimit-remaining-{kind}") == "0":
+                reset = parse_reset_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    candidates.append(reset)
+
+        wait = max(candidates) if candidates else default_seconds
+
+        self.update_from_headers(headers)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + wait)
+        logger.warning(f"⚠️ OpenAI 한도 초과 (429) - {wait:.1f}초 동안 요청 대기")
+        return wait
+
+    def snapshot(self) -> dict:
+        """모니터링용 현재 상태"""
+        return {
+            "requests": self.requests.snapshot(),
+            "tokens": self.tokens.snapshot(),
+            "blocked_for_seconds": round(max(self.blocked_until - time.monotonic(), 0.0), 2),
+            "waiting": len(self._waiters),
+        }
@@ -0,0 +1,473 @@
+# retrieval.py
+#
+# 학습 데이터(user → assistant 쌍) 기반 로컬 검색 응답기
+# - OpenAI 호출이 실패하거나 제한 시간을 넘겼을 때 하드코딩된 오류 문구 대신
+#   비슷한 user 발화에 대한 실제 나무 답장을 돌려주는 fallback 용도
+# - 문자 n-gram + BM25 역색인 (외부 라이브러리/네트워크 없음, 조회는 100µs 안팎)
+# - 충분히 비슷한 발화가 없으면 엉뚱한 답장 대신 나무 말투의 일반 답장(GENERIC_REPLIES) 사용
+#
+# 사용법:
+#   python retrieval.py build   # JSONL → 인덱스 파일 생성
+#   python retrieval.py bench   # 조회 지연 시간 측정
+
+import os
+import re
+import json
+import math
+import time
+import pickle
+import random
+import hashlib
+import argparse
+import unicodedata
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA_PATH = os.path.join(BASE_DIR, "finetune_data", "basic_finetuning_data.jsonl")
+DEFAULT_INDEX_PATH = os.path.join(BASE_DIR, "finetune_data", "namuna_fallback_index.pkl")
+
+INDEX_FORMAT_VERSION = 4  # n-gram 생성 방식/색인 대상이 바뀌면 올려서 예전 인덱스를 다시 만들도록 함
+
+# 지금 대화에 그대로 보내면 안 되는 답장 (링크, 송금/선물 알림, 주소, 계좌/전화번호)
+_UNSAFE_REPLY_PATTERN = re.compile(
+    r"https?://|www\.|[a-z0-9-]+\.(?:com|net|kr|io|me|site)\b"
+    r"|보냈어요|송금|계좌"
+    r"|[가-힣]+(?:시|구|군)\s+[가-힣0-9]+(?:로|길)\s?\d"
+    r"|\d{2,6}-\d{2,6}-\d{2,6}",
+    re.IGNORECASE,
+)
+
+# 충분히 비슷한 발화를 찾지 못했을 때 쓰는 나무 말투의 일반 답장
+GENERIC_REPLIES = [
+    "웅웅 이쁘니 얘기 더 해줘용💕",
+    "아이궁.. 나무 잠깐 정신없었오 ㅜㅜ 이쁘니 다시 말해줄래?",
+    "나무 여기 있오!! 이쁘니 무슨 일 있었오?",
+    "웅웅 나무 듣고 있오 이쁘니💕",
+]
+
+
+def file_fingerprint(path):
+    """인덱스가 어떤 학습 데이터로 만들어졌는지 확인하기 위한 파일 내용 해시"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_text(text):
+    """
+    검색용 정규화: NFKC + 소문자, 문자/숫자 외(문장부호, 이모지)는 공백으로 바꾸고
+    3번 이상 반복되는 글자는 2번으로 축약
+    """
+    text = unicodedata.normalize('NFKC', text).lower()
+    text = ''.join(ch if unicodedata.category(ch)[0] in ('L', 'N') else ' ' for ch in text)
+    text = re.sub(r'(.)\1{2,}', r'\1\1', text)
+    return ' '.join(text.split())
+
+
+def is_safe_reply(reply):
+    """fallback 답장으로 써도 되는지 확인 (링크/송금 알림/주소/번호가 들어간 답장 제외)"""
+    return not _UNSAFE_REPLY_PATTERN.search(reply)
+
+
+def char_ngrams(text, n=2):
+    """
+    정규화된 텍스트의 단어별 문자 n-gram 리스트 (n보다 짧은 단어는 단어 전체를 하나의 n-gram으로)
+
+    단어 경계를 넘는 n-gram("부산 여행" → "산여")은 띄어쓰기에 따라 생기거나 없어지므로 만들지 않음
+    """
+    grams = []
+    for word in normalize_text(text).split():
+        if len(word) <= n:
+            grams.append(word)
+        else:
+            grams.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return grams
+
+
+class BM25Index:
+    """
+    문자 n-gram BM25 역색인
+
+    - add()로 문서를 하나씩 추가 (증분 색인 가능)
+    - search()는 질의 n-gram의 posting만 훑으므로 문서 수가 늘어도 빠름
+    - 더 이상 문서를 추가하지 않는 인덱스는 compile()로 BM25 가중치를 미리 계산해두면
+      조회 시 덧셈만 남음 (add()를 다시 호출하면 자동으로 해제)
+    """
+
+    def __init__(self, ngram_size: int = 2, k1: float = 1.2, b: float = 0.75):
+        self.ngram_size = ngram_size
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # n-gram → [(doc_id, tf), ...]
+        self.doc_lengths = []
+        self.total_length = 0
+        self._compiled = None  # n-gram → [(doc_id, bm25 가중치), ...]
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, text: str) -> int:
+        """문서 추가 후 doc_id 반환"""
+        doc_id = len(self.doc_lengths)
+        grams = char_ngrams(text, self.ngram_size)
+
+        counts = {}
+        for gram in grams:
+            counts[gram] = counts.get(gram, 0) + 1
+        for gram, tf in counts.items():
+            self.postings.setdefault(gram, []).append((doc_id, tf))
+
+        self.doc_lengths.append(len(grams))
+        self.total_length += len(grams)
+        self._compiled = None
+        return doc_id
+
+    def _idf(self, doc_freq: int) -> float:
+        num_docs = len(self.doc_lengths)
+        return math.log(1 + (num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def compile(self):
+        """posting마다 BM25 가중치를 미리 계산 (정적 인덱스용)"""
+        num_docs = len(self.doc_lengths)
+        if num_docs == 0:
+            self._compiled = {}
+            return
+
+        avg_length = self.total_length / num_docs
+        k1, b = self.k1, self.b
+        norms = [k1 * (1 - b + b * length / avg_length) for length in self.doc_lengths]
+
+        compiled = {}
+        for gram, posting in self.postings.items():
+            idf = self._idf(len(posting))
+            compiled[gram] = [
+                (doc_id, idf * tf * (k1 + 1) / (tf + norms[doc_id])) for doc_id, tf in posting
+            ]
+        self._compiled = compiled
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 1,
+        max_query_grams: int = 32,
+        min_matched_grams: int = 1,
+        min_coverage: float = 0.0,
+        min_doc_coverage: float = 0.0
+    ) -> list:
+        """
+        질의와 가장 비슷한 문서 검색
+
+        긴 질의는 문서 빈도가 낮은(변별력 높은) n-gram max_query_grams개만 사용해서
+        조회 시간을 질의 길이와 무관하게 묶어둠
+
+        Parameters:
+        - min_matched_grams: 질의와 겹치는 n-gram이 이 개수 미만인 문서는 제외
+        - min_coverage: 인덱스에 있는 질의 n-gram의 IDF 합 중 문서와 겹치는 비율이 이 값 미만이면 제외
+                        ("오늘"처럼 흔한 n-gram 하나만 겹치는 약한 결과를 거르는 용도)
+        - min_doc_coverage: 문서 n-gram 중 질의와 겹치는 비율이 이 값 미만이면 제외
+                            (짧은 질의가 긴 문서의 일부와만 겹치는 경우를 거르는 용도)
+
+        Returns:
+        - [(doc_id, score), ...] 점수 내림차순 (겹치는 n-gram이 없으면 빈 리스트)
+        """
+        num_docs = len(self.doc_lengths)
+        if num_docs == 0:
+            return []
+
+        scores = {}
+        query_grams = set(char_ngrams(query, self.ngram_size))
+        if len(query_grams) > max_query_grams:
+            postings = self.postings
+            query_grams = sorted(
+                (gram for gram in query_grams if gram in postings),
+                key=lambda gram: len(postings[gram])
+            )[:max_query_grams]
+
+        needs_filter = min_matched_grams > 1 or min_coverage > 0 or min_doc_coverage > 0
+
+        if self._compiled is not None and needs_filter:
+            # 점수와 함께 문서별 겹치는 n-gram 수/IDF 합을 한 번에 집계 (posting을 두 번 훑지 않도록)
+            compiled = self._compiled
+            postings = self.postings
+            matched = {}  # doc_id → [점수, 겹치는 n-gram 수, 겹치는 IDF 합]
+            total_idf = 0.0
+            for gram in query_grams:
+                posting = compiled.get(gram)
+                if not posting:
+                    continue
+                idf = self._idf(len(postings[gram]))
+                total_idf += idf
+                for doc_id, weight in posting:
+                    entry = matched.get(doc_id)
+                    if entry is None:
+                        matched[doc_id] = [weight, 1, idf]
+                    else:
+                        entry[0] += weight
+                        entry[1] += 1
+                        entry[2] += idf
+            doc_lengths = self.doc_lengths
+            scores = {
+                doc_id: score for doc_id, (score, count, doc_idf) in matched.items()
+                if count >= min_matched_grams
+                and doc_idf >= min_coverage * total_idf
+                and count >= min_doc_coverage * doc_lengths[doc_id]
+            }
+            needs_filter = False
+        elif self._compiled is not None:
+            compiled = self._compiled
+            for gram in query_grams:
+                for doc_id, weight in compiled.get(gram, ()):
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        else:
+            avg_length = self.total_length / num_docs
+            k1, b = self.k1, self.b
+            doc_lengths = self.doc_lengths
+            for gram in query_grams:
+                posting = self.postings.get(gram)
+                if not posting:
+                    continue
+                idf = self._idf(len(posting))
+                for doc_id, tf in posting:
+                    norm = k1 * (1 - b + b * doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        if scores and needs_filter:
+            scores = self._filter_by_coverage(scores, query_grams, min_matched_grams, min_coverage, min_doc_coverage)
+
+        if not scores:
+            return []
+        if top_k == 1:
+            best = max(scores, key=scores.get)
+            return [(best, scores[best])]
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+    def _filter_by_coverage(
+        self,
+        scores: dict,
+        query_grams,
+        min_matched_grams: int,
+        min_coverage: float,
+        min_doc_coverage: float = 0.0
+    ) -> dict:
+        """질의 n-gram과 충분히 겹치는 문서만 남김"""
+        postings = self.postings
+        # 인덱스에 없는 n-gram(오타, 처음 나온 단어)은 어떤 문서와도 겹칠 수 없으므로 비율 계산에서 제외
+        query_idf = {
+            gram: self._idf(len(postings[gram])) for gram in query_grams if postings.get(gram)
+        }
+        total_idf = sum(query_idf.values())
+        if total_idf <= 0:
+            return {}
+
+        matched_counts = {}
+        matched_idf = {}
+        for gram, idf in query_idf.items():
+            posting = postings[gram]
+            for doc_id, _ in posting:
+                matched_counts[doc_id] = matched_counts.get(doc_id, 0) + 1
+                matched_idf[doc_id] = matched_idf.get(doc_id, 0.0) + idf
+
+        return {
+            doc_id: score for doc_id, score in scores.items()
+            if matched_counts[doc_id] >= min_matched_grams
+            and matched_idf[doc_id] / total_idf >= min_coverage
+            and matched_counts[doc_id] >= min_doc_coverage * self.doc_lengths[doc_id]
+        }
+
+    def to_state(self) -> dict:
+        """pickle 저장용 상태 (클래스 정의가 바뀌어도 읽을 수 있도록 기본 자료형만 사용)"""
+        return {
+            "ngram_size": self.ngram_size,
+            "k1": self.k1,
+            "b": self.b,
+            "postings": self.postings,
+            "doc_lengths": self.doc_lengths,
+            "total_length": self.total_length,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "BM25Index":
+        index = cls(ngram_size=state["ngram_size"], k1=state["k1"], b=state["b"])
+        index.postings = state["postings"]
+        index.doc_lengths = state["doc_lengths"]
+        index.total_length = state["total_length"]
+        return index
+
+
+class FallbackResponder:
+    """
+    user 발화 BM25 인덱스 + 대응하는 assistant 답장 목록
+
+    respond(message)는 충분히 비슷한 user 발화에 대해 나무가 실제로 했던 답장을 반환
+    (겹치는 n-gram이 몇 개뿐인 발화의 답장은 엉뚱한 대답이 되므로 쓰지 않음)
+    """
+
+    def __init__(
+        self,
+        index: BM25Index,
+        replies: list,
+        source_hash: str = None,
+        min_matched_grams: int = 2,
+        min_coverage: float = 0.6,
+        min_doc_coverage: float = 0.5
+    ):
+        """
+        Parameters:
+        - index: user 발화 인덱스 (doc_id 순서가 replies와 같음)
+        - replies: 발화별 나무 답장
+        - source_hash: 인덱스를 만든 학습 데이터 파일의 해시
+        - min_matched_grams / min_coverage / min_doc_coverage: 비슷한 발화로 볼 최소 기준
+          (BM25Index.search 참고 - 기준을 넘는 발화가 없으면 GENERIC_REPLIES 중 하나로 답장)
+        """
+        self.index = index
+        self.replies = replies
+        self.source_hash = source_hash
+        self.min_matched_grams = min_matched_grams
+        self.min_coverage = min_coverage
+        self.min_doc_coverage = min_doc_coverage
+        # 응답기 인덱스는 만든 뒤로 바뀌지 않으므로 가중치를 미리 계산
+        self.index.compile()
+
+    def __len__(self):
+        return len(self.replies)
+
+    @classmethod
+    def from_jsonl(cls, data_path: str = DEFAULT_DATA_PATH, ngram_size: int = 2) -> "FallbackResponder":
+        """
+        학습 데이터 JSONL에서 인덱스 생성 (멀티턴 예제는 user → 다음 assistant 쌍으로 펼침)
+
+        링크/송금 알림/주소 등이 들어간 답장(is_safe_reply)은 색인하지 않음
+        """
+        index = BM25Index(ngram_size=ngram_size)
+        replies = []
+
+        with open(data_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                messages = json.loads(line)["messages"]
+                for user_msg, assistant_msg in zip(messages, messages[1:]):
+                    if (
+                        user_msg["role"] == "user"
+                        and assistant_msg["role"] == "assistant"
+                        and is_safe_reply(assistant_msg["content"])
+                    ):
+                        index.add(user_msg["content"])
+                        replies.append(assistant_msg["content"])
+
+        return cls(index, replies, source_hash=file_fingerprint(data_path))
+
+    @classmethod
+    def load(cls, index_path: str = DEFAULT_INDEX_PATH) -> "FallbackResponder":
+        """build 명령으로 미리 만든 인덱스 파일 로드"""
+        with open(index_path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 인덱스 버전입니다: {state.get('version')}")
+        return cls(BM25Index.from_state(state["index"]), state["replies"], state.get("source_hash"))
+
+    @classmethod
+    def load_or_build(cls, index_path: str = DEFAULT_INDEX_PATH, data_path: str = DEFAULT_DATA_PATH) -> "FallbackResponder":
+        """
+        인덱스 파일이 있고 현재 학습 데이터로 만든 것이면 로드, 아니면 JSONL에서 바로 생성
+
+        (dedup/packed 모드 등으로 JSONL을 다시 만든 뒤 예전 인덱스를 계속 쓰지 않도록
+        인덱스에 저장된 학습 데이터 해시와 현재 파일 해시를 비교)
+        """
+        if os.path.exists(index_path):
+            try:
+                responder = cls.load(index_path)
+            except (ValueError, KeyError, pickle.UnpicklingError, EOFError):
+                responder = None
+            if responder and responder.source_hash == file_fingerprint(data_path):
+                return responder
+        return cls.from_jsonl(data_path)
+
+    def save(self, index_path: str = DEFAULT_INDEX_PATH):
+        state = {
+            "version": INDEX_FORMAT_VERSION,
+            "index": self.index.to_state(),
+            "replies": self.replies,
+            "source_hash": self.source_hash,
+        }
+        with open(index_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def respond(self, message: str):
+        """
+        메시지와 가장 비슷한 user 발화의 답장 반환
+
+        Returns:
+        - 답장 문자열 (기준을 넘는 발화가 없으면 GENERIC_REPLIES 중 하나)
+        """
+        hits = self.index.search(
+            message,
+            top_k=1,
+            min_matched_grams=self.min_matched_grams,
+            min_coverage=self.min_coverage,
+            min_doc_coverage=self.min_doc_coverage
+        )
+        if not hits:
+            return random.choice(GENERIC_REPLIES)
+        return self.replies[hits[0][0]]
+
+
+def build_index(data_path: str = DEFAULT_DATA_PATH, index_path: str = DEFAULT_INDEX_PATH):
+    """JSONL → 인덱스 파일 생성"""
+    print(f"📂 학습 데이터 읽는 중: {data_path}")
+    start = time.perf_counter()
+    responder = FallbackResponder.from_jsonl(data_path)
+    responder.save(index_path)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ 인덱스 생성 완료 ({elapsed * 1000:.1f}ms)")
+    print(f"  user 발화: {len(responder)}개")
+    print(f"  n-gram 종류: {len(responder.index.postings)}개")
+    print(f"  파일 크기: {os.path.getsize(index_path) / 1024:.1f}KB")
+    print(f"\n💾 파일 저장: {index_path}")
+
+
+def run_benchmark(index_path: str = DEFAULT_INDEX_PATH, data_path: str = DEFAULT_DATA_PATH, rounds: int = 5):
+    """로드 시간과 조회 지연 시간(p50/p99/max) 측정"""
+    start = time.perf_counter()
+    responder = FallbackResponder.load_or_build(index_path, data_path)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    # 학습 데이터의 user 발화 자체를 질의로 사용 (짧은 것부터 긴 것까지 고르게 포함)
+    queries = []
+    with open(data_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                queries.append(json.loads(line)["messages"][0]["content"])
+
+    latencies = []
+    for _ in range(rounds):
+        for query in queries:
+            start = time.perf_counter_ns()
+            responder.respond(query)
+            latencies.append(time.perf_counter_ns() - start)
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] / 1000
+
+    print(f"📊 조회 벤치마크 ({len(latencies)}회)")
+    print(f"  인덱스 로드: {load_ms:.1f}ms")
+    print(f"  p50: {percentile(0.50):.1f}µs")
+    print(f"  p99: {percentile(0.99):.1f}µs")
+    print(f"  max: {latencies[-1] / 1000:.1f}µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="나무나 fallback 검색 인덱스")
+    parser.add_argument("command", choices=["build", "bench"])
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="학습 데이터 JSONL 경로")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="인덱스 파일 경로")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_index(args.data, args.index)
+    else:
+        run_benchmark(args.index, args.data)
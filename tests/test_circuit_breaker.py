@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def _breaker(**kwargs):
+    options = dict(min_calls=2, window_size=4, open_seconds=0.05, half_open_timeout=0.2)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def _trip(breaker):
+    while breaker.state != OPEN:
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+
+def test_opens_on_failure_rate_and_rejects():
+    breaker = _breaker()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    assert not breaker.allow_request()
+    assert breaker.snapshot()["total_rejected"] == 1
+
+
+def test_opens_on_slow_call_rate():
+    breaker = _breaker(slow_call_seconds=1.0, slow_call_rate_threshold=0.5)
+    breaker.record_success(latency=2.0)
+    breaker.record_success(latency=2.0)
+    assert breaker.state == OPEN
+
+
+def test_stays_closed_below_min_calls():
+    breaker = _breaker(min_calls=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_success_closes():
+    breaker = _breaker()
+    _trip(breaker)
+    time.sleep(0.06)
+
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # half_open_max_calls=1 이므로 시험 호출이 끝나기 전에는 다른 호출 차단
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = _breaker()
+    _trip(breaker)
+    time.sleep(0.06)
+
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["times_opened"] == 2
+
+
+def test_snapshot_moves_open_to_half_open_without_using_probe():
+    breaker = _breaker()
+    _trip(breaker)
+    time.sleep(0.06)
+
+    assert breaker.snapshot()["state"] == HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_unfinished_probe_times_out_back_to_open():
+    breaker = _breaker(half_open_timeout=0.05)
+    _trip(breaker)
+    time.sleep(0.06)
+
+    assert breaker.allow_request()  # 결과를 기록하지 않는 시험 호출
+    time.sleep(0.06)
+    assert breaker.snapshot()["state"] == OPEN
+
+    # open_seconds가 다시 지나면 새 시험 호출 허용
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+
+
+def test_release_returns_probe_slot():
+    breaker = _breaker()
+    _trip(breaker)
+    time.sleep(0.06)
+
+    assert breaker.allow_request()
+    breaker.release()  # 429처럼 성공/실패로 집계하지 않는 결과
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_call_records_success_failure_and_timeout():
+    breaker = _breaker(min_calls=10)
+
+    async def scenario():
+        assert await breaker.call(lambda: 42, timeout=1) == 42
+        with pytest.raises(ValueError):
+            await breaker.call(_raise_value_error, timeout=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await breaker.call(time.sleep, 0.2, timeout=0.05)
+
+    asyncio.run(scenario())
+    snapshot = breaker.snapshot()
+    assert snapshot["total_calls"] == 3
+    assert snapshot["total_failures"] == 2
+
+
+def test_call_raises_when_open():
+    breaker = _breaker()
+    _trip(breaker)
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(breaker.call(lambda: 42, timeout=1))
+
+
+def test_cancelled_probe_releases_slot():
+    breaker = _breaker()
+    _trip(breaker)
+    time.sleep(0.06)
+
+    async def scenario():
+        task = asyncio.create_task(breaker.call(time.sleep, 0.1, timeout=1))
+        await asyncio.sleep(0.02)
+        assert breaker.state == HALF_OPEN and not breaker.allow_request()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    # 취소는 실패로 집계하지 않고 자리만 반환 → 다음 시험 호출 가능
+    assert breaker.state == HALF_OPEN
+    assert breaker.snapshot()["total_failures"] == 2
+    assert breaker.allow_request()
+
+
+def _raise_value_error():
+    raise ValueError("boom")
@@ -0,0 +1,45 @@
+from long_term_memory import LongTermMemory
+
+
+def _memory(tmp_path, exchanges):
+    memory = LongTermMemory(store_path=str(tmp_path / "memory.jsonl"))
+    for date, user, assistant in exchanges:
+        memory.add("user", user, date)
+        memory.add("assistant", assistant, date)
+    return memory
+
+
+PAST_EXCHANGES = [
+    ("2025-03-01", "다음주 토요일에 부산 여행 가기로 했잖아", "웅웅 완전 기대돼"),
+    ("2025-03-02", "오늘 회사에서 팀장님한테 혼났어", "아이궁 이쁘니 속상했겠다"),
+    ("2025-03-03", "오늘 회사 회식이야", "재밌게 놀다와용"),
+    ("2025-03-04", "ㅋㅋ 그치", "ㅋㅋㅋㅋ 마쟈"),
+    ("2025-03-05", "떡볶이 먹고싶다", "엽떡 시켜먹자"),
+]
+
+
+def test_recalls_paraphrased_past_topic(tmp_path):
+    memory = _memory(tmp_path, PAST_EXCHANGES)
+
+    records = memory.search("부산 여행 언제 가지?")
+    assert records and records[0]["user"] == "다음주 토요일에 부산 여행 가기로 했잖아"
+
+    records = memory.search("팀장님 또 그래")
+    assert records and records[0]["user"] == "오늘 회사에서 팀장님한테 혼났어"
+
+
+def test_ignores_weak_matches(tmp_path):
+    memory = _memory(tmp_path, PAST_EXCHANGES)
+
+    assert memory.search("ㅋㅋ") == []
+    assert memory.search("오늘 뭐해") == []
+
+
+def test_excludes_date_and_reloads_from_file(tmp_path):
+    memory = _memory(tmp_path, PAST_EXCHANGES)
+    assert memory.search("떡볶이 먹고 싶어", exclude_date="2025-03-05") == []
+
+    reloaded = LongTermMemory(store_path=memory.store_path)
+    assert len(reloaded) == len(PAST_EXCHANGES)
+    records = reloaded.search("떡볶이 먹고 싶어")
+    assert records[0]["assistant"] == "엽떡 시켜먹자"
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+from rate_limit import RateLimitGovernor, parse_reset_duration
+
+
+async def _acquire_in_order(governor, requests):
+    """(이름, 마감 오프셋, 우선순위 오프셋)을 순서대로 대기시키고 한도를 확보한 순서를 반환"""
+    now = time.monotonic()
+    acquired = []
+
+    async def worker(name, deadline_offset, priority_offset):
+        priority = now + priority_offset if priority_offset is not None else None
+        if await governor.acquire(10, now + deadline_offset, priority=priority):
+            acquired.append(name)
+
+    tasks = []
+    for request in requests:
+        tasks.append(asyncio.create_task(worker(*request)))
+        await asyncio.sleep(0)  # 요청이 들어온 순서대로 대기열에 들어가도록
+    await asyncio.gather(*tasks)
+    return acquired
+
+
+def test_parse_reset_duration():
+    assert parse_reset_duration("1s") == 1.0
+    assert parse_reset_duration("6m0s") == 360.0
+    assert parse_reset_duration("20ms") == 0.02
+    assert parse_reset_duration("1h2m3.5s") == 3723.5
+    assert parse_reset_duration("") is None
+
+
+def test_waiters_are_served_by_deadline():
+    governor = RateLimitGovernor()
+    governor.blocked_until = time.monotonic() + 0.1
+
+    acquired = asyncio.run(_acquire_in_order(governor, [
+        ("late", 3.0, None),
+        ("early", 1.0, None),
+        ("middle", 2.0, None),
+    ]))
+
+    assert acquired == ["early", "middle", "late"]
+
+
+def test_priority_overrides_deadline_for_ordering():
+    # 자체 제한 시간(deadline)은 모두 같고 콜백 마감(priority)만 다른 경우
+    governor = RateLimitGovernor()
+    governor.blocked_until = time.monotonic() + 0.1
+
+    acquired = asyncio.run(_acquire_in_order(governor, [
+        ("started_first", 2.0, 40.0),
+        ("closest_callback", 2.0, 30.0),
+    ]))
+
+    assert acquired == ["closest_callback", "started_first"]
+
+
+def test_acquire_returns_false_when_deadline_passes():
+    governor = RateLimitGovernor()
+
+    async def scenario():
+        governor.penalize({"retry-after": "5"})
+        start = time.monotonic()
+        result = await governor.acquire(10, start + 0.1)
+        return result, time.monotonic() - start
+
+    result, elapsed = asyncio.run(scenario())
+    assert result is False
+    # 한도가 풀리는 시각이 마감 뒤면 기다리지 않고 바로 포기
+    assert elapsed < 0.05
+    assert governor.snapshot()["waiting"] == 0
+
+
+def test_waiter_behind_queue_times_out():
+    governor = RateLimitGovernor(request_limit=60)  # 초당 1개씩 채워짐
+    governor.requests.available = 0
+
+    acquired = asyncio.run(_acquire_in_order(governor, [
+        ("first", 1.5, None),
+        ("second", 0.2, 5.0),  # 우선순위가 뒤라서 기다리다가 자기 마감에 포기
+    ]))
+
+    assert acquired == ["first"]
+    assert governor.snapshot()["waiting"] == 0
+
+
+def test_token_bucket_limits_large_requests():
+    governor = RateLimitGovernor(token_limit=600)  # 초당 10토큰
+
+    async def scenario():
+        assert await governor.acquire(590, time.monotonic() + 1)
+        # 남은 10토큰으로는 부족하고 1초 안에 채워지지 않음
+        return await governor.acquire(200, time.monotonic() + 1)
+
+    assert asyncio.run(scenario()) is False
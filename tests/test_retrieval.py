@@ -0,0 +1,42 @@
+import json
+
+from retrieval import GENERIC_REPLIES, FallbackResponder, char_ngrams
+
+
+def _write_jsonl(path, pairs):
+    with open(path, 'w', encoding='utf-8') as f:
+        for user, assistant in pairs:
+            conv = {"messages": [{"role": "user", "content": user}, {"role": "assistant", "content": assistant}]}
+            f.write(json.dumps(conv, ensure_ascii=False) + '\n')
+
+
+def test_char_ngrams_stay_within_words():
+    assert char_ngrams("부산 여행 언제 가지?") == ["부산", "여행", "언제", "가지"]
+    assert char_ngrams("😛!!") == []
+
+
+def test_responder_uses_similar_utterance_only(tmp_path):
+    data_path = tmp_path / "data.jsonl"
+    _write_jsonl(data_path, [
+        ("나무 보고싶어", "나둥 이따 영상통화 하자"),
+        ("나무는 거기 집 가서 운동 하다가 배고파서 밥 먹을 거야", "효정이 7시반쯤까지 데리러 갈게!"),
+        ("오늘 뭐 먹었어", "나무는 김치찌개 먹었오"),
+    ])
+    responder = FallbackResponder.from_jsonl(str(data_path))
+
+    assert responder.respond("나무 보고싶어!!") == "나둥 이따 영상통화 하자"
+    assert responder.respond("배고파") in GENERIC_REPLIES
+    assert responder.respond("hello") in GENERIC_REPLIES
+
+
+def test_responder_skips_unsafe_replies(tmp_path):
+    data_path = tmp_path / "data.jsonl"
+    _write_jsonl(data_path, [
+        ("여기 어때", "기분스시 서울 은평구 진흥로5길 4-1 https://naver.me/xMjoSMvN"),
+        ("용돈 줘", "20,000원을 보냈어요. 송금 받기 전까지 보낸 분은 취소할 수 있어요."),
+        ("나무 사랑해", "나두 사량해"),
+    ])
+    responder = FallbackResponder.from_jsonl(str(data_path))
+
+    assert responder.replies == ["나두 사량해"]
+    assert responder.respond("여기 어때") in GENERIC_REPLIES
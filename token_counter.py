@@ -0,0 +1,140 @@
+# token_counter.py
+#
+# GPT-4o/4.1 계열(o200k_base) 토큰 수 계산
+# - tiktoken + 저장소에 포함된 o200k_base 인코딩 파일(tiktoken_cache/) 사용
+#   → 인코딩 파일을 내려받지 않으므로 오프라인/배포 환경에서도 실제 토크나이저와 같은 값
+# - tiktoken을 쓸 수 없을 때만 근사치로 대체
+#   (basic_finetuning_data.jsonl 3,932개 발화를 o200k_base로 센 값에 맞춘 계수,
+#    측정 결과 전체 합계 +3%, 발화별 평균 절대 오차 13%)
+
+import os
+import re
+import logging
+
+logger = logging.getLogger("namuna-chat")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# tiktoken 캐시 디렉토리 (파일 이름은 인코딩 URL의 sha1, 내용은 tiktoken이 sha256으로 검증)
+TIKTOKEN_CACHE_DIR = os.path.join(BASE_DIR, "tiktoken_cache")
+ENCODING_NAME = "o200k_base"
+
+# 채팅 포맷 오버헤드 (OpenAI 문서 기준)
+TOKENS_PER_MESSAGE = 3   # <|start|>{role}\n ... <|end|>
+REPLY_PRIMING_TOKENS = 3  # 모든 대화 끝에 붙는 assistant 시작 토큰
+
+_encoding = None
+_encoding_loaded = False
+
+# o200k의 pre-tokenize 규칙처럼 앞 공백 1개는 뒤 단어에 붙여서 조각으로 나눔
+_PIECE_PATTERN = re.compile(
+    r" ?[가-힣]+"                       # 한글 음절
+    r"| ?[ㄱ-ㅎㅏ-ㅣ]+"                  # 한글 자모 (ㅋㅋ, ㅠㅠ 등)
+    r"| ?[A-Za-z]+"                     # 영문 단어
+    r"|[0-9]{1,3}"                      # 숫자 (최대 3자리씩 끊김)
+    r"|\s*\n+"                          # 줄바꿈 (앞 공백 포함)
+    r"|\s+"                             # 그 외 공백
+    r"| ?[!-/:-@\[-`{-~]+"              # ASCII 문장부호 연속 (..., ?!, :// 등)
+    r"| ?[^\sA-Za-z0-9가-힣ㄱ-ㅎㅏ-ㅣ!-/:-@\[-`{-~]+"  # 그 외 기호 연속 (이모지, … 등)
+)
+
+# 조각 종류별 (기본 토큰, 글자당 토큰) - o200k_base 실제 값에 최소제곱으로 맞춘 계수
+_PIECE_COEFFICIENTS = {
+    "hangul": (0.44, 0.77),
+    "jamo": (1.93, 0.43),
+    "latin": (0.38, 0.31),
+    "punct": (0.87, 0.11),
+    "symbol": (0.68, 0.51),
+}
+
+
+def _get_encoding():
+    """o200k_base 인코딩 로드 (처음 한 번만, 실패하면 None)"""
+    global _encoding, _encoding_loaded
+    if _encoding_loaded:
+        return _encoding
+    _encoding_loaded = True
+
+    # 다른 캐시 경로가 지정되어 있지 않으면 저장소에 포함된 파일 사용
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", TIKTOKEN_CACHE_DIR)
+    try:
+        import tiktoken
+        _encoding = tiktoken.get_encoding(ENCODING_NAME)
+    except Exception as e:
+        logger.warning(f"⚠️ tiktoken {ENCODING_NAME} 로드 실패 - 근사치로 토큰 수 계산: {e!r}")
+        _encoding = None
+    return _encoding
+
+
+def _piece_kind(piece):
+    first = piece.lstrip(" ")[:1]
+    if not first or first.isspace():
+        return "space"
+    if '가' <= first <= '힣':
+        return "hangul"
+    if 'ㄱ' <= first <= 'ㅣ':
+        return "jamo"
+    if first.isascii() and first.isalpha():
+        return "latin"
+    if first.isdigit():
+        return "digit"
+    if first.isascii():
+        return "punct"
+    return "symbol"
+
+
+def _estimate_tokens(text):
+    """
+    tiktoken 없이 토큰 수 근사
+
+    조각 종류별로 `기본 + 글자당 × 글자 수`를 더함 (공백/숫자 조각은 1토큰).
+    계수는 학습 데이터 발화를 o200k_base로 센 값에 맞춘 것이라 짧은 발화 하나하나보다는
+    대화 여러 개의 합계(패킹 예산, 한도 계산)에서 정확함
+    """
+    total = 0.0
+    for piece in _PIECE_PATTERN.findall(text):
+        kind = _piece_kind(piece)
+        if kind in ("space", "digit"):
+            total += 1
+            continue
+        base, per_char = _PIECE_COEFFICIENTS[kind]
+        total += base + per_char * len(piece.lstrip(" "))
+    return max(1, round(total))
+
+
+def count_tokens(text):
+    """
+    텍스트의 토큰 수
+
+    Parameters:
+    - text: 토큰 수를 셀 문자열
+
+    Returns:
+    - o200k_base 토큰 수 (tiktoken을 쓸 수 없으면 근사치, 빈 문자열이면 0)
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return _estimate_tokens(text)
+
+
+def count_message_tokens(messages, include_reply_priming=False):
+    """
+    채팅 메시지 리스트의 토큰 수 (메시지별 포맷 오버헤드 포함)
+
+    Parameters:
+    - messages: [{"role": "user", "content": "..."}, ...]
+    - include_reply_priming: True면 응답 생성용 priming 토큰까지 포함 (API 요청 시)
+
+    Returns:
+    - 토큰 수
+    """
+    total = 0
+    for msg in messages:
+        total += TOKENS_PER_MESSAGE
+        total += count_tokens(msg.get("role", ""))
+        total += count_tokens(msg.get("content", ""))
+    if include_reply_priming:
+        total += REPLY_PRIMING_TOKENS
+    return total